@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterator, Protocol
+
+Messages = list[dict[str, object]]
+
+
+@dataclass(frozen=True)
+class TokenUsage:
+    input_tokens: int | None = None
+    output_tokens: int | None = None
+
+
+class TransientBackendError(RuntimeError):
+    # Timeouts, dropped connections, 5xx and 429 responses: worth retrying later.
+    def __init__(self, message: str, retry_after_seconds: float | None = None) -> None:
+        super().__init__(message)
+        self.retry_after_seconds = retry_after_seconds
+
+
+class RateLimitedError(TransientBackendError):
+    pass
+
+
+class GenerationBackend(Protocol):
+    name: str
+
+    def complete(
+        self, model: str, messages: Messages, max_output_tokens: int
+    ) -> tuple[str, TokenUsage]: ...
+
+    def stream(
+        self, model: str, messages: Messages, max_output_tokens: int
+    ) -> Iterator[str | TokenUsage]: ...
+
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+
+_FAKE_PUNCHLINES = (
+    "{seed}? I would explain it, but the punchline is still loading.",
+    "They asked about {seed}. I said it was fine, which was the first lie of the day.",
+    "{seed} walked into a bar. The bar had read the reviews and left.",
+    "My therapist told me to stop thinking about {seed}. She charges extra for that now.",
+    "Experts agree {seed} is overrated. The experts also lost their keys this morning.",
+)
+
+
+# No simulated call takes longer than this many times the larger of latency and jitter.
+_MAX_LATENCY_FACTOR = 10
+
+
+@dataclass(frozen=True)
+class FakeBackendSettings:
+    latency_ms: float = 800.0
+    jitter_ms: float = 200.0
+    distribution: str = "lognormal"
+    first_token_fraction: float = 0.3
+    rate_limit_probability: float = 0.0
+    error_probability: float = 0.0
+    retry_after_seconds: float = 1.0
+    random_seed: int = 0
+
+
+class FakeBackend:
+    # Deterministic local stand-in for the Responses API: the same input always gives
+    # the same joke, and latency, streaming pace and 429s follow FakeBackendSettings.
+    name = "fake"
+
+    def __init__(self, settings: FakeBackendSettings | None = None) -> None:
+        self.settings = settings or FakeBackendSettings()
+        if self.settings.distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {self.settings.distribution}")
+        self._random = random.Random(self.settings.random_seed)
+        self._lock = threading.Lock()
+
+    def _sample_latency(self) -> float:
+        latency = max(0.0, self.settings.latency_ms)
+        jitter = max(0.0, self.settings.jitter_ms)
+        with self._lock:
+            if self.settings.distribution == "uniform":
+                sample = self._random.uniform(latency - jitter, latency + jitter)
+            elif self.settings.distribution == "normal":
+                sample = self._random.gauss(latency, jitter)
+            elif self.settings.distribution == "lognormal" and latency > 0:
+                # Median at latency_ms and a right tail whose spread is about jitter_ms.
+                sigma = math.sqrt(math.log1p((jitter / latency) ** 2))
+                sample = latency * self._random.lognormvariate(0.0, sigma)
+            else:
+                sample = latency
+        ceiling = _MAX_LATENCY_FACTOR * max(latency, jitter)
+        return min(max(0.0, sample), ceiling) / 1000
+
+    def _maybe_fail(self) -> None:
+        with self._lock:
+            roll = self._random.random()
+        if roll < self.settings.rate_limit_probability:
+            time.sleep(min(0.05, self._sample_latency()))
+            raise RateLimitedError(
+                "Simulated 429 from the fake backend.",
+                retry_after_seconds=self.settings.retry_after_seconds,
+            )
+        if roll < self.settings.rate_limit_probability + self.settings.error_probability:
+            time.sleep(self._sample_latency())
+            raise TransientBackendError("Simulated 503 from the fake backend.")
+
+    @staticmethod
+    def _respond(messages: Messages, max_output_tokens: int) -> tuple[str, TokenUsage]:
+        prompt = "\n".join(
+            str(part.get("text", ""))
+            for message in messages
+            for part in message.get("content", [])
+        )
+        seed_line = prompt.rsplit("input:", 1)[-1].splitlines()[0] if "input:" in prompt else ""
+        seed = seed_line.strip().strip('"') or "that"
+        digest = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest(), 16)
+        text = _FAKE_PUNCHLINES[digest % len(_FAKE_PUNCHLINES)].format(seed=seed)
+        text = text[0].upper() + text[1:]
+        output_tokens = min(max_output_tokens, math.ceil(len(text) / 4))
+        return text, TokenUsage(input_tokens=math.ceil(len(prompt) / 4), output_tokens=output_tokens)
+
+    def complete(
+        self, model: str, messages: Messages, max_output_tokens: int
+    ) -> tuple[str, TokenUsage]:
+        self._maybe_fail()
+        time.sleep(self._sample_latency())
+        return self._respond(messages, max_output_tokens)
+
+    def stream(
+        self, model: str, messages: Messages, max_output_tokens: int
+    ) -> Iterator[str | TokenUsage]:
+        self._maybe_fail()
+        text, usage = self._respond(messages, max_output_tokens)
+        total = self._sample_latency()
+        chunks = [word + " " for word in text.split(" ")]
+        chunks[-1] = chunks[-1].rstrip()
+        time.sleep(total * self.settings.first_token_fraction)
+        gap = total * (1 - self.settings.first_token_fraction) / max(1, len(chunks) - 1)
+        for index, chunk in enumerate(chunks):
+            if index:
+                time.sleep(gap)
+            yield chunk
+        yield usage
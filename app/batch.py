@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from app.database import NewJoke, init_db, save_jokes
+from app.joke_engine import (
+    GenerationResult,
+    estimate_request_tokens,
+    generate_joke_result,
+    get_template,
+)
+from app.ratelimit import RateLimiter
+
+
+@dataclass(frozen=True)
+class BatchRow:
+    index: int
+    template_key: str
+    user_input: str
+    add_on: str
+
+
+@dataclass
+class BatchReport:
+    skipped: int = 0
+    generated: int = 0
+    cached: int = 0
+    saved: int = 0
+    failed: int = 0
+    interrupted: bool = False
+    rate_limited_seconds: float = 0.0
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return time.perf_counter() - self.started
+
+    def progress_line(self) -> str:
+        elapsed = self.elapsed_seconds
+        rate = self.saved / elapsed if elapsed else 0.0
+        return (
+            f"{self.saved} saved, {self.failed} failed, {self.skipped} skipped "
+            f"in {elapsed:.1f}s ({rate:.2f} jokes/s)"
+        )
+
+
+class Checkpoint:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.done: set[int] = set()
+        if path.exists():
+            with path.open(encoding="utf-8") as handle:
+                self.done = {int(line) for line in handle if line.strip()}
+
+    def record(self, indexes: Iterable[int]) -> None:
+        with self.path.open("a", encoding="utf-8") as handle:
+            handle.writelines(f"{index}\n" for index in indexes)
+            handle.flush()
+            os.fsync(handle.fileno())
+
+
+def _to_row(index: int, item: dict, default_template: str | None) -> BatchRow:
+    return BatchRow(
+        index=index,
+        template_key=str(item.get("template_key") or default_template or ""),
+        user_input=str(item.get("user_input") or ""),
+        add_on=str(item.get("add_on") or ""),
+    )
+
+
+def read_rows(path: Path, default_template: str | None = None) -> Iterator[BatchRow]:
+    if path.suffix.lower() in (".jsonl", ".ndjson"):
+        with path.open(encoding="utf-8") as handle:
+            for index, line in enumerate(handle):
+                if line.strip():
+                    yield _to_row(index, json.loads(line), default_template)
+        return
+
+    with path.open(newline="", encoding="utf-8") as handle:
+        for index, item in enumerate(csv.DictReader(handle)):
+            yield _to_row(index, item, default_template)
+
+
+def _generate(row: BatchRow, limiter: RateLimiter) -> GenerationResult:
+    if not row.user_input.strip():
+        raise RuntimeError("Row has no user_input.")
+    get_template(row.template_key)
+    limiter.acquire(estimate_request_tokens(row.template_key, row.user_input, row.add_on))
+    return generate_joke_result(row.template_key, row.user_input, row.add_on)
+
+
+def run_batch(
+    path: Path,
+    *,
+    concurrency: int = 4,
+    requests_per_minute: float | None = None,
+    tokens_per_minute: float | None = None,
+    batch_size: int = 50,
+    checkpoint_path: Path | None = None,
+    default_template: str | None = None,
+) -> BatchReport:
+    checkpoint = Checkpoint(checkpoint_path or path.with_name(path.name + ".checkpoint"))
+    limiter = RateLimiter(
+        requests_per_minute=requests_per_minute,
+        tokens_per_minute=tokens_per_minute,
+    )
+    report = BatchReport()
+    pending: dict[Future, BatchRow] = {}
+    finished: list[tuple[BatchRow, GenerationResult]] = []
+
+    def flush() -> None:
+        if not finished:
+            return
+        save_jokes(
+            [
+                NewJoke(
+                    template_key=row.template_key,
+                    template_name=get_template(row.template_key).name,
+                    user_input=row.user_input,
+                    add_on=row.add_on,
+                    generated_joke=result.text,
+                    model=result.model,
+                    input_tokens=result.input_tokens,
+                    output_tokens=result.output_tokens,
+                    latency_ms=result.latency_ms,
+                    cache_hit=result.cache_hit,
+                    coalesced=result.coalesced,
+                )
+                for row, result in finished
+            ]
+        )
+        checkpoint.record(row.index for row, _ in finished)
+        report.saved += len(finished)
+        finished.clear()
+        print(report.progress_line(), file=sys.stderr)
+
+    def collect(futures: Iterable[Future]) -> None:
+        for future in futures:
+            row = pending.pop(future)
+            if future.cancelled():
+                continue
+            try:
+                result = future.result()
+            except (KeyError, RuntimeError) as error:
+                report.failed += 1
+                print(f"Row {row.index}: {error}", file=sys.stderr)
+                continue
+            report.generated += 1
+            report.cached += int(result.cache_hit)
+            finished.append((row, result))
+        if len(finished) >= batch_size:
+            flush()
+
+    workers = max(1, concurrency)
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="joke-batch")
+    try:
+        for row in read_rows(path, default_template):
+            if row.index in checkpoint.done:
+                report.skipped += 1
+                continue
+            while len(pending) >= workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending[executor.submit(_generate, row, limiter)] = row
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+    except KeyboardInterrupt:
+        report.interrupted = True
+        print("Interrupted: finishing in-flight requests and saving progress.", file=sys.stderr)
+        executor.shutdown(wait=True, cancel_futures=True)
+        collect(list(pending))
+    finally:
+        executor.shutdown(wait=True)
+        flush()
+
+    report.rate_limited_seconds = limiter.stats().total_wait_seconds
+    return report
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.batch",
+        description="Generate and save jokes for every row of a CSV or JSONL file.",
+    )
+    parser.add_argument("input", type=Path, help="CSV or JSONL with template_key, user_input, add_on.")
+    parser.add_argument("--template", help="Template key for rows without template_key.")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rpm", type=float, help="Requests per minute limit.")
+    parser.add_argument("--tpm", type=float, help="Estimated tokens per minute limit.")
+    parser.add_argument("--batch-size", type=int, default=50, help="Rows per database write.")
+    parser.add_argument(
+        "--checkpoint",
+        type=Path,
+        help="Progress file (default: <input>.checkpoint). Delete it to start over.",
+    )
+    args = parser.parse_args(argv)
+
+    init_db()
+    report = run_batch(
+        args.input,
+        concurrency=args.concurrency,
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm,
+        batch_size=args.batch_size,
+        checkpoint_path=args.checkpoint,
+        default_template=args.template,
+    )
+
+    elapsed = report.elapsed_seconds
+    print(
+        "\n".join(
+            [
+                "Batch finished." if not report.interrupted else "Batch interrupted; rerun to resume.",
+                f"  saved:        {report.saved}",
+                f"  from cache:   {report.cached}",
+                f"  failed:       {report.failed}",
+                f"  skipped:      {report.skipped} (already in checkpoint)",
+                f"  elapsed:      {elapsed:.1f}s",
+                f"  throughput:   {report.saved / elapsed if elapsed else 0.0:.2f} jokes/s",
+                f"  rate limited: {report.rate_limited_seconds:.1f}s total wait",
+            ]
+        )
+    )
+    if report.interrupted:
+        return 130
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,59 @@
 from __future__ import annotations
 
 import os
-from dataclasses import dataclass
-from datetime import datetime, timezone
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from typing import Callable, Iterator, NamedTuple, TypeVar
 from urllib.parse import urlparse
 
 import streamlit as st
-from sqlalchemy import DateTime, Integer, String, Text, create_engine, func, or_, select
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import (
+    Boolean,
+    DateTime,
+    Engine,
+    Index,
+    Integer,
+    Select,
+    String,
+    Text,
+    and_,
+    case,
+    column,
+    delete,
+    func,
+    insert,
+    literal_column,
+    or_,
+    select,
+    table,
+    update,
+)
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import Mapped, Session, declarative_base, mapped_column, sessionmaker
+from sqlalchemy.sql.selectable import Join
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from app.cache import CacheStats, LRUCache
+from app.engines import (
+    PoolMetrics,
+    PostgresPoolSettings,
+    SQLiteProfile,
+    instrument_queries,
+    pool_metrics,
+    postgres_engine,
+    sqlite_engine,
+)
+from app.metrics import start_metrics_server, timed
+from app.migrations import run_migrations
+
+
+T = TypeVar("T")
 
 
 @dataclass
@@ -21,6 +65,62 @@ class JokeRecord:
     user_input: str
     add_on: str
     generated_joke: str
+    snippet: str = ""
+    model: str | None = None
+    input_tokens: int | None = None
+    output_tokens: int | None = None
+    latency_ms: int | None = None
+    cache_hit: bool | None = None
+    coalesced: bool | None = None
+
+
+@dataclass
+class NewJoke:
+    template_key: str
+    template_name: str
+    user_input: str
+    add_on: str
+    generated_joke: str
+    model: str | None = None
+    input_tokens: int | None = None
+    output_tokens: int | None = None
+    latency_ms: int | None = None
+    cache_hit: bool | None = None
+    coalesced: bool | None = None
+
+
+@dataclass
+class JokePage:
+    records: list[JokeRecord]
+    next_cursor: int | None
+
+
+class JokePreview(NamedTuple):
+    id: int
+    created_at: str
+    template_key: str
+    template_name: str
+    input_preview: str
+    joke_preview: str
+    snippet: str
+
+
+@dataclass
+class JokePreviewPage:
+    previews: list[JokePreview]
+    next_cursor: int | None
+
+
+@dataclass(frozen=True)
+class GenerationUsage:
+    group: str
+    jokes: int
+    cache_hits: int
+    mean_latency_ms: float | None
+    max_latency_ms: int | None
+    input_tokens: int
+    output_tokens: int
+    mean_output_tokens: float | None
 
 
 def _secret_or_env(name: str) -> str | None:
@@ -64,12 +164,63 @@ DATABASE_URL = _normalize_database_url(_resolve_database_url())
 IS_SQLITE = DATABASE_URL.startswith("sqlite://")
 Base = declarative_base()
 
-engine = create_engine(
-    DATABASE_URL,
-    future=True,
-    pool_pre_ping=True,
-    connect_args={"check_same_thread": False} if IS_SQLITE else {},
-)
+
+def _sqlite_profile() -> SQLiteProfile:
+    defaults = SQLiteProfile()
+    return SQLiteProfile(
+        journal_mode=_secret_or_env("SQLITE_JOURNAL_MODE") or defaults.journal_mode,
+        synchronous=_secret_or_env("SQLITE_SYNCHRONOUS") or defaults.synchronous,
+        busy_timeout_ms=int(_secret_or_env("SQLITE_BUSY_TIMEOUT_MS") or defaults.busy_timeout_ms),
+        mmap_size=int(_secret_or_env("SQLITE_MMAP_SIZE") or defaults.mmap_size),
+        cache_size=int(_secret_or_env("SQLITE_CACHE_SIZE") or defaults.cache_size),
+        temp_store=_secret_or_env("SQLITE_TEMP_STORE") or defaults.temp_store,
+        pool_size=int(_secret_or_env("SQLITE_POOL_SIZE") or defaults.pool_size),
+        max_overflow=int(_secret_or_env("SQLITE_MAX_OVERFLOW") or defaults.max_overflow),
+    )
+
+
+def _flag(name: str, default: bool) -> bool:
+    value = _secret_or_env(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+def _postgres_pool_settings(read_replica: bool = False) -> PostgresPoolSettings:
+    defaults = PostgresPoolSettings()
+    statement_timeout = _secret_or_env("DATABASE_STATEMENT_TIMEOUT_MS")
+    # Replica reads fall back to the primary, so they give up on connecting sooner.
+    if read_replica:
+        connect_timeout = _secret_or_env("DATABASE_READ_CONNECT_TIMEOUT_SECONDS") or 3
+    else:
+        connect_timeout = (
+            _secret_or_env("DATABASE_CONNECT_TIMEOUT_SECONDS") or defaults.connect_timeout_seconds
+        )
+    return PostgresPoolSettings(
+        pool_size=int(_secret_or_env("DATABASE_POOL_SIZE") or defaults.pool_size),
+        max_overflow=int(_secret_or_env("DATABASE_MAX_OVERFLOW") or defaults.max_overflow),
+        pool_timeout_seconds=float(
+            _secret_or_env("DATABASE_POOL_TIMEOUT_SECONDS") or defaults.pool_timeout_seconds
+        ),
+        pool_recycle_seconds=int(
+            _secret_or_env("DATABASE_POOL_RECYCLE_SECONDS") or defaults.pool_recycle_seconds
+        ),
+        pre_ping=_flag("DATABASE_POOL_PRE_PING", defaults.pre_ping),
+        statement_timeout_ms=int(statement_timeout) if statement_timeout else None,
+        # 0 leaves the connect timeout to libpq and the OS.
+        connect_timeout_seconds=int(connect_timeout) or None,
+        transaction_pooler=_flag("DATABASE_TRANSACTION_POOLER", defaults.transaction_pooler),
+    )
+
+
+def _build_engine(url: str, read_replica: bool = False) -> Engine:
+    if url.startswith("sqlite://"):
+        return sqlite_engine(url, _sqlite_profile())
+    return postgres_engine(url, _postgres_pool_settings(read_replica))
+
+
+engine = _build_engine(DATABASE_URL)
+instrument_queries(engine)
 SessionLocal = sessionmaker(
     bind=engine,
     autocommit=False,
@@ -78,6 +229,28 @@ SessionLocal = sessionmaker(
     future=True,
 )
 
+# Optional replica for reads. Writes and migrations always use the primary engine.
+DATABASE_READ_URL = _normalize_database_url(_secret_or_env("DATABASE_READ_URL") or DATABASE_URL)
+read_engine = (
+    engine
+    if DATABASE_READ_URL == DATABASE_URL
+    else _build_engine(DATABASE_READ_URL, read_replica=True)
+)
+if read_engine is not engine:
+    instrument_queries(read_engine, "sql.replica")
+ReadSessionLocal = sessionmaker(
+    bind=read_engine,
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+    future=True,
+)
+READ_YOUR_WRITES_SECONDS = float(_secret_or_env("READ_YOUR_WRITES_SECONDS") or 10)
+REPLICA_RETRY_SECONDS = float(_secret_or_env("REPLICA_RETRY_SECONDS") or 30)
+_recent_writers: dict[str, float] = {}
+_replica_down_until = 0.0
+_routing_lock = threading.Lock()
+
 
 class Joke(Base):
     __tablename__ = "jokes"
@@ -87,12 +260,96 @@ class Joke(Base):
         DateTime(timezone=True),
         default=lambda: datetime.now(timezone.utc),
         nullable=False,
+        index=True,
     )
-    template_key: Mapped[str] = mapped_column(String(100), nullable=False, index=True)
+    template_key: Mapped[str] = mapped_column(String(100), nullable=False)
     template_name: Mapped[str] = mapped_column(String(255), nullable=False)
     user_input: Mapped[str] = mapped_column(Text, nullable=False)
     add_on: Mapped[str] = mapped_column(Text, nullable=False, default="")
     generated_joke: Mapped[str] = mapped_column(Text, nullable=False)
+    # Generation metadata; null for jokes saved before it was recorded.
+    model: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    input_tokens: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    output_tokens: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    latency_ms: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    cache_hit: Mapped[bool | None] = mapped_column(Boolean, nullable=True)
+    # Shared another request's answer; latency_ms is then the wait, not a call.
+    coalesced: Mapped[bool | None] = mapped_column(Boolean, nullable=True)
+
+
+# Serves "template_key IN (...) ORDER BY id DESC LIMIT n" and plain template_key
+# lookups; previews still read the text columns from the table.
+Index("ix_jokes_template_key_id", Joke.template_key, Joke.id.desc())
+
+
+class JokeStats(Base):
+    __tablename__ = "joke_stats"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    latest_created_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+
+
+class GenerationCacheEntry(Base):
+    __tablename__ = "generation_cache"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    cache_key: Mapped[str] = mapped_column(String(64), nullable=False, index=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+    template_key: Mapped[str] = mapped_column(String(100), nullable=False)
+    seed: Mapped[str] = mapped_column(Text, nullable=False)
+    model: Mapped[str] = mapped_column(String(100), nullable=False)
+    prompt_version: Mapped[int] = mapped_column(Integer, nullable=False)
+    output: Mapped[str] = mapped_column(Text, nullable=False)
+
+
+# Previews keep one character more than they show, so callers can tell text was cut.
+PREVIEW_LENGTH = 90
+_STATS_ROW_ID = 1
+STATS_CACHE_TTL_SECONDS = float(_secret_or_env("STATS_CACHE_TTL_SECONDS") or 30)
+# (write version, read time, stats); an entry read before a local save is never served.
+_stats_cache: tuple[int, float, tuple[int, str]] | None = None
+_stats_lock = threading.Lock()
+
+# Library query results are shared by all sessions in this process. Local saves bump
+# the write version, which retires every cached entry; the TTL bounds staleness from
+# writes made by other processes.
+QUERY_CACHE_SIZE = int(_secret_or_env("QUERY_CACHE_SIZE") or 256)
+QUERY_CACHE_TTL_SECONDS = float(_secret_or_env("QUERY_CACHE_TTL_SECONDS") or 60)
+_query_cache: LRUCache[tuple, JokePreviewPage] = LRUCache(QUERY_CACHE_SIZE, QUERY_CACHE_TTL_SECONDS)
+_write_version = 0
+_write_version_lock = threading.Lock()
+_sqlite_write_lock = threading.Lock()
+
+
+_SEARCH_TERM_PATTERN = re.compile(r"\w+")
+_HIGHLIGHT = "**"
+_jokes_fts = table("jokes_fts", column("rowid", Integer))
+
+
+class _CrossJoin(Join):
+    # SQLite never reorders the tables of a CROSS JOIN, so searches walk the FTS index in
+    # rowid order and stop at LIMIT instead of probing it once per row of a jokes index.
+    inherit_cache = True
+
+
+@compiles(_CrossJoin)
+def _compile_cross_join(join: _CrossJoin, compiler, **kw) -> str:
+    kw.pop("asfrom", None)
+    left = compiler.process(join.left, asfrom=True, **kw)
+    right = compiler.process(join.right, asfrom=True, **kw)
+    return f"{left} CROSS JOIN {right} ON {compiler.process(join.onclause, **kw)}"
+
+# Postgres only uses the GIN index from migrations.py when the query repeats
+# its exact expression.
+_PG_SEARCH_CONFIG = literal_column("'simple'::regconfig")
+_PG_SPACE = literal_column("' '", String)
 
 
 def get_storage_label() -> str:
@@ -126,6 +383,12 @@ def _to_record(joke: Joke) -> JokeRecord:
         user_input=joke.user_input,
         add_on=joke.add_on,
         generated_joke=joke.generated_joke,
+        model=joke.model,
+        input_tokens=joke.input_tokens,
+        output_tokens=joke.output_tokens,
+        latency_ms=joke.latency_ms,
+        cache_hit=joke.cache_hit,
+        coalesced=joke.coalesced,
     )
 
 
@@ -133,11 +396,186 @@ def _session() -> Session:
     return SessionLocal()
 
 
+def _session_key() -> str:
+    context = get_script_run_ctx(suppress_warning=True)
+    if context is not None:
+        return context.session_id
+    return f"thread-{threading.get_ident()}"
+
+
+def _mark_write() -> None:
+    if read_engine is engine:
+        return
+    now = time.monotonic()
+    with _routing_lock:
+        _recent_writers[_session_key()] = now
+        if len(_recent_writers) > 1024:
+            cutoff = now - READ_YOUR_WRITES_SECONDS
+            for key in [key for key, written in _recent_writers.items() if written < cutoff]:
+                del _recent_writers[key]
+
+
+def _reads_on_replica() -> bool:
+    if read_engine is engine:
+        return False
+    now = time.monotonic()
+    if now < _replica_down_until:
+        return False
+    # Read-your-writes: a session that just saved reads from the primary until the replica catches up.
+    written = _recent_writers.get(_session_key())
+    return written is None or now - written >= READ_YOUR_WRITES_SECONDS
+
+
+def _read(operation: Callable[[Session], T]) -> T:
+    global _replica_down_until
+
+    if _reads_on_replica():
+        session = ReadSessionLocal()
+        try:
+            return operation(session)
+        except OperationalError:
+            _replica_down_until = time.monotonic() + REPLICA_RETRY_SECONDS
+        finally:
+            session.close()
+
+    session = _session()
+    try:
+        return operation(session)
+    finally:
+        session.close()
+
+
+def _search_terms(search_text: str) -> list[str]:
+    return _SEARCH_TERM_PATTERN.findall(search_text.lower())
+
+
+def _pg_search_text():
+    return (
+        Joke.user_input
+        + _PG_SPACE
+        + Joke.add_on
+        + _PG_SPACE
+        + Joke.generated_joke
+        + _PG_SPACE
+        + Joke.template_name
+    )
+
+
+_initialized = False
+_init_lock = threading.Lock()
+
+
 def init_db() -> None:
+    global _initialized
+
+    if _initialized:
+        return
+
+    with _init_lock:
+        if _initialized:
+            return
+        try:
+            run_migrations(engine, Base.metadata)
+        except SQLAlchemyError as error:
+            raise RuntimeError(f"Could not initialize database ({get_storage_label()}).") from error
+        metrics_port = _secret_or_env("METRICS_PORT")
+        if metrics_port:
+            start_metrics_server(int(metrics_port))
+        _initialized = True
+
+
+def _record_write() -> None:
+    global _stats_cache, _write_version
+
+    with _write_version_lock:
+        _write_version += 1
+    _stats_cache = None
+
+
+@contextmanager
+def _write_lock() -> Iterator[None]:
+    # SQLite has a single writer; queueing writers in-process beats spinning on busy_timeout.
+    if not IS_SQLITE:
+        yield
+        return
+    with _sqlite_write_lock:
+        yield
+
+
+def write_version() -> int:
+    return _write_version
+
+
+def database_pool_metrics() -> PoolMetrics | None:
+    return pool_metrics(engine)
+
+
+def read_pool_metrics() -> PoolMetrics | None:
+    return None if read_engine is engine else pool_metrics(read_engine)
+
+
+def query_cache_stats() -> CacheStats:
+    return _query_cache.stats()
+
+
+@timed("db.save_jokes")
+def save_jokes(records: list[NewJoke]) -> list[int]:
+    if not records:
+        return []
+
+    created_at = datetime.now(timezone.utc)
+    rows = [
+        {
+            "created_at": created_at,
+            "template_key": record.template_key,
+            "template_name": record.template_name,
+            "user_input": record.user_input.strip(),
+            "add_on": record.add_on.strip(),
+            "generated_joke": record.generated_joke,
+            "model": record.model,
+            "input_tokens": record.input_tokens,
+            "output_tokens": record.output_tokens,
+            "latency_ms": record.latency_ms,
+            "cache_hit": record.cache_hit,
+            "coalesced": record.coalesced,
+        }
+        for record in records
+    ]
+
+    session = _session()
     try:
-        Base.metadata.create_all(bind=engine)
+        with _write_lock():
+            joke_ids = session.scalars(
+                insert(Joke).returning(Joke.id, sort_by_parameter_order=True),
+                rows,
+            ).all()
+            session.execute(
+                update(JokeStats)
+                .where(JokeStats.id == _STATS_ROW_ID)
+                .values(
+                    total=JokeStats.total + len(rows),
+                    # Writers can commit out of order; latest_created_at only moves forward.
+                    latest_created_at=case(
+                        (
+                            or_(
+                                JokeStats.latest_created_at.is_(None),
+                                JokeStats.latest_created_at < created_at,
+                            ),
+                            created_at,
+                        ),
+                        else_=JokeStats.latest_created_at,
+                    ),
+                )
+            )
+            session.commit()
+        _record_write()
+        _mark_write()
+        return [int(joke_id) for joke_id in joke_ids]
     except SQLAlchemyError as error:
-        raise RuntimeError(f"Could not initialize database ({get_storage_label()}).") from error
+        session.rollback()
+        raise RuntimeError("Could not save jokes to database.") from error
+    finally:
+        session.close()
 
 
 def save_joke(
@@ -147,39 +585,42 @@ def save_joke(
     user_input: str,
     add_on: str,
     generated_joke: str,
+    model: str | None = None,
+    input_tokens: int | None = None,
+    output_tokens: int | None = None,
+    latency_ms: int | None = None,
+    cache_hit: bool | None = None,
+    coalesced: bool | None = None,
 ) -> int:
-    session = _session()
-    try:
-        joke = Joke(
-            template_key=template_key,
-            template_name=template_name,
-            user_input=user_input.strip(),
-            add_on=add_on.strip(),
-            generated_joke=generated_joke,
-        )
-        session.add(joke)
-        session.commit()
-        session.refresh(joke)
-        return int(joke.id)
-    except SQLAlchemyError as error:
-        session.rollback()
-        raise RuntimeError("Could not save joke to database.") from error
-    finally:
-        session.close()
+    return save_jokes(
+        [
+            NewJoke(
+                template_key=template_key,
+                template_name=template_name,
+                user_input=user_input,
+                add_on=add_on,
+                generated_joke=generated_joke,
+                model=model,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                latency_ms=latency_ms,
+                cache_hit=cache_hit,
+                coalesced=coalesced,
+            )
+        ]
+    )[0]
 
 
-def list_jokes(
-    *,
-    search_text: str = "",
-    template_keys: list[str] | None = None,
-    limit: int = 50,
-) -> list[JokeRecord]:
-    normalized_limit = max(1, min(limit, 500))
+def _order_column(search_text: str):
+    # jokes_fts.rowid equals jokes.id; ordering and paging on it keeps the FTS scan in order.
+    if IS_SQLITE and _search_terms(search_text):
+        return _jokes_fts.c.rowid
+    return Joke.id
 
-    session = _session()
-    try:
-        statement = select(Joke)
 
+def _apply_search(statement: Select, search_text: str, rank_by_relevance: bool) -> Select:
+    terms = _search_terms(search_text)
+    if not terms:
         if search_text.strip():
             like = f"%{search_text.strip()}%"
             statement = statement.where(
@@ -190,27 +631,401 @@ def list_jokes(
                     Joke.template_name.ilike(like),
                 )
             )
+        return statement.add_columns(literal_column("''").label("snippet")).order_by(Joke.id.desc())
+
+    if IS_SQLITE:
+        match_query = " ".join(f'"{term}"*' for term in terms)
+        fts = literal_column("jokes_fts")
+        statement = (
+            statement.select_from(
+                _CrossJoin(_jokes_fts, Joke.__table__, Joke.id == _jokes_fts.c.rowid)
+            )
+            .where(fts.op("MATCH")(match_query))
+            .add_columns(
+                func.snippet(fts, -1, _HIGHLIGHT, _HIGHLIGHT, "...", 16).label("snippet")
+            )
+        )
+        if rank_by_relevance:
+            statement = statement.order_by(func.bm25(fts))
+        return statement.order_by(_jokes_fts.c.rowid.desc())
+
+    ts_query = func.to_tsquery(_PG_SEARCH_CONFIG, " & ".join(f"{term}:*" for term in terms))
+    document = func.to_tsvector(_PG_SEARCH_CONFIG, _pg_search_text())
+    statement = statement.where(document.op("@@")(ts_query)).add_columns(
+        func.ts_headline(
+            _PG_SEARCH_CONFIG,
+            _pg_search_text(),
+            ts_query,
+            f"StartSel={_HIGHLIGHT}, StopSel={_HIGHLIGHT}, MaxWords=24, MinWords=8",
+        ).label("snippet")
+    )
+    if rank_by_relevance:
+        statement = statement.order_by(func.ts_rank(document, ts_query).desc())
+    return statement.order_by(Joke.id.desc())
+
+
+def _filtered_statement(
+    base: Select,
+    search_text: str,
+    template_keys: list[str] | None,
+    rank_by_relevance: bool,
+) -> Select:
+    statement = _apply_search(base, search_text, rank_by_relevance)
+    if template_keys:
+        statement = statement.where(Joke.template_key.in_(template_keys))
+    return statement
+
+
+def _paged_statement(
+    base: Select,
+    *,
+    search_text: str,
+    template_keys: list[str] | None,
+    limit: int,
+    after_id: int | None,
+    rank_by_relevance: bool,
+) -> tuple[Select, int]:
+    normalized_limit = max(1, min(limit, 500))
+    # Relevance order has no stable keyset, so ranked searches return a single page.
+    use_cursor = not (rank_by_relevance and _search_terms(search_text))
+
+    statement = _filtered_statement(base, search_text, template_keys, rank_by_relevance)
+    if after_id is not None and use_cursor:
+        statement = statement.where(_order_column(search_text) < after_id)
+
+    # One extra row tells whether another page follows.
+    return statement.limit(normalized_limit + 1 if use_cursor else normalized_limit), normalized_limit
+
+
+def _next_cursor(items: list, limit: int) -> tuple[list, int | None]:
+    if len(items) > limit:
+        items = items[:limit]
+        return items, items[-1].id
+    return items, None
+
+
+@timed("db.list_jokes_page")
+def list_jokes_page(
+    *,
+    search_text: str = "",
+    template_keys: list[str] | None = None,
+    limit: int = 50,
+    after_id: int | None = None,
+    rank_by_relevance: bool = False,
+) -> JokePage:
+    statement, normalized_limit = _paged_statement(
+        select(Joke),
+        search_text=search_text,
+        template_keys=template_keys,
+        limit=limit,
+        after_id=after_id,
+        rank_by_relevance=rank_by_relevance,
+    )
+
+    try:
+        rows = _read(lambda session: session.execute(statement).all())
+    except SQLAlchemyError as error:
+        raise RuntimeError("Could not read jokes from database.") from error
+
+    records = [replace(_to_record(joke), snippet=snippet or "") for joke, snippet in rows]
+
+    records, next_cursor = _next_cursor(records, normalized_limit)
+    return JokePage(records=records, next_cursor=next_cursor)
+
+
+def list_jokes(
+    *,
+    search_text: str = "",
+    template_keys: list[str] | None = None,
+    limit: int = 50,
+    after_id: int | None = None,
+    rank_by_relevance: bool = False,
+) -> list[JokeRecord]:
+    return list_jokes_page(
+        search_text=search_text,
+        template_keys=template_keys,
+        limit=limit,
+        after_id=after_id,
+        rank_by_relevance=rank_by_relevance,
+    ).records
+
+
+@timed("db.list_joke_previews")
+def list_joke_previews(
+    *,
+    search_text: str = "",
+    template_keys: list[str] | None = None,
+    limit: int = 50,
+    after_id: int | None = None,
+    rank_by_relevance: bool = False,
+) -> JokePreviewPage:
+    # Replica results may lag a local save, so they never answer a read-your-writes session.
+    cache_key = (
+        _write_version,
+        _reads_on_replica(),
+        search_text.strip(),
+        tuple(sorted(template_keys or ())),
+        limit,
+        after_id,
+        rank_by_relevance,
+    )
+    cached = _query_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    base = select(
+        Joke.id,
+        Joke.created_at,
+        Joke.template_key,
+        Joke.template_name,
+        func.substr(Joke.user_input, 1, PREVIEW_LENGTH + 1).label("input_preview"),
+        func.substr(Joke.generated_joke, 1, PREVIEW_LENGTH + 1).label("joke_preview"),
+    )
+    statement, normalized_limit = _paged_statement(
+        base,
+        search_text=search_text,
+        template_keys=template_keys,
+        limit=limit,
+        after_id=after_id,
+        rank_by_relevance=rank_by_relevance,
+    )
+
+    try:
+        rows = _read(lambda session: session.execute(statement).all())
+    except SQLAlchemyError as error:
+        raise RuntimeError("Could not read jokes from database.") from error
+
+    previews = [
+        JokePreview(
+            id=row.id,
+            created_at=_to_iso_utc(row.created_at),
+            template_key=row.template_key,
+            template_name=row.template_name,
+            input_preview=row.input_preview,
+            joke_preview=row.joke_preview,
+            snippet=row.snippet or "",
+        )
+        for row in rows
+    ]
+
+    previews, next_cursor = _next_cursor(previews, normalized_limit)
+    page = JokePreviewPage(previews=previews, next_cursor=next_cursor)
+    _query_cache.set(cache_key, page)
+    return page
 
-        if template_keys:
-            statement = statement.where(Joke.template_key.in_(template_keys))
 
-        statement = statement.order_by(Joke.id.desc()).limit(normalized_limit)
-        rows = list(session.scalars(statement).all())
-        return [_to_record(row) for row in rows]
+@timed("db.get_jokes")
+def get_jokes(joke_ids: list[int]) -> list[JokeRecord]:
+    if not joke_ids:
+        return []
+
+    statement = select(Joke).where(Joke.id.in_(joke_ids)).order_by(Joke.id.desc())
+    try:
+        jokes = _read(lambda session: session.scalars(statement).all())
+    except SQLAlchemyError as error:
+        raise RuntimeError("Could not read jokes from database.") from error
+    return [_to_record(joke) for joke in jokes]
+
+
+def get_joke(joke_id: int) -> JokeRecord | None:
+    records = get_jokes([joke_id])
+    return records[0] if records else None
+
+
+def iter_joke_batches(
+    *,
+    search_text: str = "",
+    template_keys: list[str] | None = None,
+    batch_size: int = 1000,
+) -> Iterator[list[JokeRecord]]:
+    statement = _filtered_statement(select(Joke), search_text, template_keys, False).execution_options(
+        yield_per=max(1, batch_size)
+    )
+
+    # Streams cannot switch servers halfway, so exports pick a side once and do not fall back.
+    session = ReadSessionLocal() if _reads_on_replica() else _session()
+    try:
+        result = session.execute(statement)
+        for rows in result.partitions():
+            yield [replace(_to_record(joke), snippet=snippet or "") for joke, snippet in rows]
     except SQLAlchemyError as error:
         raise RuntimeError("Could not read jokes from database.") from error
     finally:
         session.close()
 
 
-def get_stats() -> tuple[int, str]:
+@timed("db.load_cached_generations")
+def load_cached_generations(cache_key: str, *, limit: int) -> list[tuple[datetime, str]]:
+    statement = (
+        select(GenerationCacheEntry.created_at, GenerationCacheEntry.output)
+        .where(GenerationCacheEntry.cache_key == cache_key)
+        .order_by(GenerationCacheEntry.id.desc())
+        .limit(max(1, limit))
+    )
+    try:
+        rows = _read(lambda session: session.execute(statement).all())
+    except SQLAlchemyError as error:
+        raise RuntimeError("Could not read generation cache.") from error
+    return [(created_at, output) for created_at, output in rows]
+
+
+@timed("db.store_cached_generation")
+def store_cached_generation(
+    *,
+    cache_key: str,
+    template_key: str,
+    seed: str,
+    model: str,
+    prompt_version: int,
+    output: str,
+    keep: int = 1,
+) -> datetime:
+    created_at = datetime.now(timezone.utc)
+    # Only the newest `keep` variants per key are ever read back.
+    stale = (
+        select(GenerationCacheEntry.id)
+        .where(GenerationCacheEntry.cache_key == cache_key)
+        .order_by(GenerationCacheEntry.id.desc())
+        .offset(max(1, keep))
+    )
     session = _session()
     try:
-        total = session.scalar(select(func.count(Joke.id))) or 0
-        latest = session.scalar(select(func.max(Joke.created_at)))
-        latest_label = _to_iso_utc(latest) if latest else "No jokes yet"
-        return int(total), latest_label
+        with _write_lock():
+            session.add(
+                GenerationCacheEntry(
+                    cache_key=cache_key,
+                    created_at=created_at,
+                    template_key=template_key,
+                    seed=seed,
+                    model=model,
+                    prompt_version=prompt_version,
+                    output=output,
+                )
+            )
+            session.flush()
+            session.execute(
+                delete(GenerationCacheEntry).where(GenerationCacheEntry.id.in_(stale))
+            )
+            session.commit()
+        return created_at
     except SQLAlchemyError as error:
-        raise RuntimeError("Could not read database stats.") from error
+        session.rollback()
+        raise RuntimeError("Could not write generation cache.") from error
+    finally:
+        session.close()
+
+
+@timed("db.prune_generation_cache")
+def prune_generation_cache(*, older_than: datetime) -> int:
+    session = _session()
+    try:
+        with _write_lock():
+            result = session.execute(
+                delete(GenerationCacheEntry).where(GenerationCacheEntry.created_at < older_than)
+            )
+            session.commit()
+        return result.rowcount or 0
+    except SQLAlchemyError as error:
+        session.rollback()
+        raise RuntimeError("Could not prune generation cache.") from error
     finally:
         session.close()
+
+
+def _read_stats() -> tuple[int, str]:
+    try:
+        stats = _read(lambda session: session.get(JokeStats, _STATS_ROW_ID))
+    except SQLAlchemyError as error:
+        raise RuntimeError("Could not read database stats.") from error
+
+    if stats is None or not stats.total:
+        return 0, "No jokes yet"
+    latest_label = _to_iso_utc(stats.latest_created_at) if stats.latest_created_at else "No jokes yet"
+    return int(stats.total), latest_label
+
+
+def _fresh_stats() -> tuple[int, str] | None:
+    cached = _stats_cache
+    if cached is None or cached[0] != _write_version:
+        return None
+    if time.monotonic() - cached[1] >= STATS_CACHE_TTL_SECONDS:
+        return None
+    return cached[2]
+
+
+@timed("db.get_stats")
+def get_stats() -> tuple[int, str]:
+    global _stats_cache
+
+    if read_engine is not engine and not _reads_on_replica():
+        return _read_stats()
+
+    cached = _fresh_stats()
+    if cached is not None:
+        return cached
+
+    with _stats_lock:
+        cached = _fresh_stats()
+        if cached is not None:
+            return cached
+        # Tag with the version seen before reading: a save that commits mid-read retires it.
+        version = _write_version
+        stats = _read_stats()
+        _stats_cache = (version, time.monotonic(), stats)
+        return stats
+
+
+def _generation_usage(group: object, since: datetime | None) -> list[GenerationUsage]:
+    # Latency and token averages only count OpenAI calls; cache hits cost no tokens and
+    # coalesced rows only waited for another request's call.
+    called = and_(Joke.cache_hit.is_(False), Joke.coalesced.is_not(True))
+    statement = (
+        select(
+            group.label("group"),
+            func.count().label("jokes"),
+            func.coalesce(func.sum(case((Joke.cache_hit.is_(True), 1), else_=0)), 0).label(
+                "cache_hits"
+            ),
+            func.avg(case((called, Joke.latency_ms))).label("mean_latency_ms"),
+            func.max(case((called, Joke.latency_ms))).label("max_latency_ms"),
+            func.coalesce(func.sum(Joke.input_tokens), 0).label("input_tokens"),
+            func.coalesce(func.sum(Joke.output_tokens), 0).label("output_tokens"),
+            func.avg(Joke.output_tokens).label("mean_output_tokens"),
+        )
+        .group_by(group)
+        .order_by(group)
+    )
+    if since is not None:
+        statement = statement.where(Joke.created_at >= since)
+
+    try:
+        rows = _read(lambda session: session.execute(statement).all())
+    except SQLAlchemyError as error:
+        raise RuntimeError("Could not read generation usage.") from error
+
+    return [
+        GenerationUsage(
+            group=str(row.group),
+            jokes=int(row.jokes),
+            cache_hits=int(row.cache_hits),
+            mean_latency_ms=None if row.mean_latency_ms is None else float(row.mean_latency_ms),
+            max_latency_ms=row.max_latency_ms,
+            input_tokens=int(row.input_tokens),
+            output_tokens=int(row.output_tokens),
+            mean_output_tokens=(
+                None if row.mean_output_tokens is None else float(row.mean_output_tokens)
+            ),
+        )
+        for row in rows
+    ]
+
+
+@timed("db.generation_usage_by_template")
+def generation_usage_by_template(*, since: datetime | None = None) -> list[GenerationUsage]:
+    return _generation_usage(Joke.template_key, since)
+
+
+@timed("db.generation_usage_by_day")
+def generation_usage_by_day(*, days: int = 30) -> list[GenerationUsage]:
+    since = datetime.now(timezone.utc) - timedelta(days=max(1, days))
+    return _generation_usage(func.date(Joke.created_at), since)
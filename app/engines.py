@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from app.metrics import observe
+
+
+@dataclass(frozen=True)
+class SQLiteProfile:
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    busy_timeout_ms: int = 5000
+    mmap_size: int = 256 * 1024 * 1024
+    # Negative values are KiB, so this is a 64 MiB page cache per connection.
+    cache_size: int = -64 * 1024
+    temp_store: str = "MEMORY"
+    pool_size: int = 8
+    max_overflow: int = 8
+
+    def pragmas(self) -> list[str]:
+        return [
+            f"PRAGMA journal_mode={self.journal_mode}",
+            f"PRAGMA synchronous={self.synchronous}",
+            f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}",
+            f"PRAGMA mmap_size={int(self.mmap_size)}",
+            f"PRAGMA cache_size={int(self.cache_size)}",
+            f"PRAGMA temp_store={self.temp_store}",
+        ]
+
+
+@dataclass(frozen=True)
+class PostgresPoolSettings:
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout_seconds: float = 30.0
+    pool_recycle_seconds: int = 1800
+    pre_ping: bool = True
+    statement_timeout_ms: int | None = None
+    # Bounds the TCP connect and startup, so an unreachable server fails fast instead of
+    # waiting for the OS timeout (minutes). libpq needs whole seconds.
+    connect_timeout_seconds: int | None = 10
+    # PgBouncer / Supavisor in transaction mode: no server-side prepared statements
+    # and no session-level settings, since each transaction may land on another backend.
+    transaction_pooler: bool = False
+
+
+@dataclass(frozen=True)
+class PoolMetrics:
+    pool_size: int
+    max_overflow: int
+    checked_out: int
+    peak_checked_out: int
+    checkouts: int
+    timeouts: int
+    total_wait_seconds: float
+    max_wait_seconds: float
+
+    @property
+    def capacity(self) -> int:
+        return self.pool_size + max(0, self.max_overflow)
+
+    @property
+    def saturation(self) -> float:
+        return self.checked_out / self.capacity if self.capacity else 0.0
+
+    @property
+    def peak_saturation(self) -> float:
+        return self.peak_checked_out / self.capacity if self.capacity else 0.0
+
+    @property
+    def mean_wait_ms(self) -> float:
+        return self.total_wait_seconds * 1000 / self.checkouts if self.checkouts else 0.0
+
+
+class InstrumentedQueuePool(QueuePool):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._metrics_lock = threading.Lock()
+        self._checkouts = 0
+        self._timeouts = 0
+        self._peak_checked_out = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            with self._metrics_lock:
+                self._timeouts += 1
+            raise
+        waited = time.perf_counter() - started
+        with self._metrics_lock:
+            self._checkouts += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+            self._peak_checked_out = max(self._peak_checked_out, self.checkedout())
+        return connection
+
+    def metrics(self) -> PoolMetrics:
+        with self._metrics_lock:
+            return PoolMetrics(
+                pool_size=self.size(),
+                max_overflow=self._max_overflow,
+                checked_out=self.checkedout(),
+                peak_checked_out=self._peak_checked_out,
+                checkouts=self._checkouts,
+                timeouts=self._timeouts,
+                total_wait_seconds=self._total_wait,
+                max_wait_seconds=self._max_wait,
+            )
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+
+def sqlite_engine(url: str, profile: SQLiteProfile) -> Engine:
+    if _is_memory_sqlite(url):
+        return create_engine(url, future=True, connect_args={"check_same_thread": False})
+
+    engine = create_engine(
+        url,
+        future=True,
+        poolclass=InstrumentedQueuePool,
+        pool_size=profile.pool_size,
+        max_overflow=profile.max_overflow,
+        connect_args={
+            "check_same_thread": False,
+            "timeout": profile.busy_timeout_ms / 1000,
+        },
+    )
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in profile.pragmas():
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    return engine
+
+
+def postgres_engine(url: str, settings: PostgresPoolSettings) -> Engine:
+    connect_args: dict[str, object] = {}
+    if settings.connect_timeout_seconds and "connect_timeout=" not in url:
+        connect_args["connect_timeout"] = max(1, int(settings.connect_timeout_seconds))
+    if settings.transaction_pooler:
+        connect_args["prepare_threshold"] = None
+    elif settings.statement_timeout_ms:
+        connect_args["options"] = f"-c statement_timeout={int(settings.statement_timeout_ms)}"
+
+    engine = create_engine(
+        url,
+        future=True,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.pool_size,
+        max_overflow=settings.max_overflow,
+        pool_timeout=settings.pool_timeout_seconds,
+        pool_recycle=settings.pool_recycle_seconds,
+        pool_pre_ping=settings.pre_ping,
+        connect_args=connect_args,
+    )
+
+    if settings.transaction_pooler and settings.statement_timeout_ms:
+
+        @event.listens_for(engine, "begin")
+        def _set_statement_timeout(connection) -> None:
+            connection.exec_driver_sql(
+                f"SET LOCAL statement_timeout = {int(settings.statement_timeout_ms)}"
+            )
+
+    return engine
+
+
+def instrument_queries(engine: Engine, prefix: str = "sql") -> None:
+    # Per-statement timings are recorded as "<prefix>.<verb>", e.g. "sql.select".
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_timer(connection, cursor, statement, parameters, context, executemany) -> None:
+        connection.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop_timer(connection, cursor, statement, parameters, context, executemany) -> None:
+        elapsed = time.perf_counter() - connection.info["query_start"].pop()
+        verb = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else "empty"
+        observe(f"{prefix}.{verb}", elapsed)
+
+
+def pool_metrics(engine: Engine) -> PoolMetrics | None:
+    pool = engine.pool
+    if isinstance(pool, InstrumentedQueuePool):
+        return pool.metrics()
+    return None
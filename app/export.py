@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import csv
+import json
+import tempfile
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Iterable
+
+from app.database import JokeRecord, iter_joke_batches
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = None
+    pq = None
+
+
+EXPORT_COLUMNS = (
+    "id",
+    "created_at",
+    "template_key",
+    "template_name",
+    "user_input",
+    "add_on",
+    "generated_joke",
+    "model",
+    "input_tokens",
+    "output_tokens",
+    "latency_ms",
+    "cache_hit",
+    "coalesced",
+)
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", ".csv"),
+    "jsonl": ("application/x-ndjson", ".jsonl"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+}
+
+# Prepared exports live here until downloaded; remove_stale_exports clears the ones
+# whose session ended first.
+EXPORT_DIR = Path(tempfile.gettempdir()) / "joke-studio-exports"
+
+
+def available_formats() -> list[str]:
+    return [name for name in EXPORT_FORMATS if name != "parquet" or pa is not None]
+
+
+def _export_row(record: JokeRecord) -> dict[str, object]:
+    row = asdict(record)
+    return {column: row[column] for column in EXPORT_COLUMNS}
+
+
+def _write_csv(batches: Iterable[list[JokeRecord]], path: Path) -> int:
+    count = 0
+    with path.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(EXPORT_COLUMNS)
+        for batch in batches:
+            writer.writerows([_export_row(record).values() for record in batch])
+            count += len(batch)
+    return count
+
+
+def _write_jsonl(batches: Iterable[list[JokeRecord]], path: Path) -> int:
+    count = 0
+    with path.open("w", encoding="utf-8") as handle:
+        for batch in batches:
+            handle.writelines(
+                json.dumps(_export_row(record), ensure_ascii=False) + "\n" for record in batch
+            )
+            count += len(batch)
+    return count
+
+
+def _write_parquet(batches: Iterable[list[JokeRecord]], path: Path) -> int:
+    if pa is None:
+        raise RuntimeError("Parquet export needs the 'pyarrow' package. Run: pip install pyarrow")
+
+    schema = pa.schema(
+        [
+            ("id", pa.int64()),
+            ("created_at", pa.string()),
+            ("template_key", pa.string()),
+            ("template_name", pa.string()),
+            ("user_input", pa.string()),
+            ("add_on", pa.string()),
+            ("generated_joke", pa.string()),
+            ("model", pa.string()),
+            ("input_tokens", pa.int64()),
+            ("output_tokens", pa.int64()),
+            ("latency_ms", pa.int64()),
+            ("cache_hit", pa.bool_()),
+            ("coalesced", pa.bool_()),
+        ]
+    )
+    count = 0
+    with pq.ParquetWriter(str(path), schema) as writer:
+        for batch in batches:
+            rows = [_export_row(record) for record in batch]
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            count += len(batch)
+    return count
+
+
+_WRITERS = {
+    "csv": _write_csv,
+    "jsonl": _write_jsonl,
+    "parquet": _write_parquet,
+}
+
+
+def export_jokes(
+    path: Path,
+    export_format: str,
+    *,
+    search_text: str = "",
+    template_keys: list[str] | None = None,
+    batch_size: int = 1000,
+) -> int:
+    if export_format not in _WRITERS:
+        raise KeyError(f"Unknown export format: {export_format}")
+
+    batches = iter_joke_batches(
+        search_text=search_text,
+        template_keys=template_keys,
+        batch_size=batch_size,
+    )
+    return _WRITERS[export_format](batches, path)
+
+
+def new_export_path(suffix: str) -> Path:
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        prefix="jokes-", suffix=suffix, dir=EXPORT_DIR, delete=False
+    ) as handle:
+        return Path(handle.name)
+
+
+def remove_stale_exports(max_age_seconds: float) -> int:
+    if not EXPORT_DIR.exists():
+        return 0
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    for path in EXPORT_DIR.glob("jokes-*"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except FileNotFoundError:
+            continue
+    return removed
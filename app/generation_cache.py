@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from app.cache import LRUCache
+from app.database import load_cached_generations, prune_generation_cache, store_cached_generation
+
+CACHE_MODES = ("fresh", "max_age", "variants")
+_PRUNE_INTERVAL_SECONDS = 3600.0
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    mode: str = "fresh"
+    max_age_seconds: float = 3600.0
+    max_variants: int = 3
+
+    def __post_init__(self) -> None:
+        if self.mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode: {self.mode}")
+
+
+@dataclass(frozen=True)
+class GenerationKey:
+    template_key: str
+    seed: str
+    model: str
+    prompt_version: int
+
+    def digest(self) -> str:
+        payload = json.dumps(
+            [self.template_key, self.seed, self.model, self.prompt_version],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class GenerationCacheStats:
+    memory_hits: int
+    database_hits: int
+    misses: int
+    bypassed: int
+    errors: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.memory_hits + self.database_hits + self.misses
+        return (self.memory_hits + self.database_hits) / lookups if lookups else 0.0
+
+
+def normalize_seed(seed: str) -> str:
+    return " ".join(seed.casefold().split())
+
+
+def _age_seconds(created_at: datetime) -> float:
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - created_at).total_seconds()
+
+
+class GenerationCache:
+    def __init__(
+        self,
+        policy: CachePolicy,
+        *,
+        memory_size: int = 1024,
+        memory_ttl_seconds: float = 300.0,
+        retention_seconds: float = 30 * 86400.0,
+    ) -> None:
+        self.policy = policy
+        self.retention_seconds = retention_seconds
+        self._next_prune = 0.0
+        # Newest-first (created_at, output) variants per key digest; also caches empty lookups.
+        self._memory: LRUCache[str, list[tuple[datetime, str]]] = LRUCache(
+            memory_size, memory_ttl_seconds
+        )
+        self._lock = threading.Lock()
+        self._counts = {"memory_hits": 0, "database_hits": 0, "misses": 0, "bypassed": 0, "errors": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def _variant_limit(self, policy: CachePolicy) -> int:
+        return max(1, policy.max_variants) if policy.mode == "variants" else 1
+
+    def _variants(self, key: GenerationKey, policy: CachePolicy) -> tuple[list[tuple[datetime, str]], bool]:
+        digest = key.digest()
+        variants = self._memory.get(digest)
+        if variants is not None:
+            return variants, True
+        variants = load_cached_generations(digest, limit=self._variant_limit(policy))
+        self._memory.set(digest, variants)
+        return variants, False
+
+    def lookup(self, key: GenerationKey, policy: CachePolicy | None = None) -> str | None:
+        policy = policy or self.policy
+        if policy.mode == "fresh":
+            self._count("bypassed")
+            return None
+
+        try:
+            variants, from_memory = self._variants(key, policy)
+        except RuntimeError:
+            self._count("errors")
+            return None
+
+        output = None
+        if policy.mode == "max_age":
+            if variants and _age_seconds(variants[0][0]) < policy.max_age_seconds:
+                output = variants[0][1]
+        elif len(variants) >= self._variant_limit(policy):
+            output = random.choice(variants[: self._variant_limit(policy)])[1]
+
+        if output is None:
+            self._count("misses")
+        else:
+            self._count("memory_hits" if from_memory else "database_hits")
+        return output
+
+    def store(self, key: GenerationKey, output: str, policy: CachePolicy | None = None) -> None:
+        policies = [self.policy] if policy is None else [self.policy, policy]
+        if all(item.mode == "fresh" for item in policies):
+            # Nothing would ever read it back.
+            return
+
+        digest = key.digest()
+        try:
+            created_at = store_cached_generation(
+                cache_key=digest,
+                template_key=key.template_key,
+                seed=key.seed,
+                model=key.model,
+                prompt_version=key.prompt_version,
+                output=output,
+                keep=max(self._variant_limit(item) for item in policies),
+            )
+            self._prune_expired()
+        except RuntimeError:
+            self._count("errors")
+            return
+
+        variants = self._memory.get(digest) or []
+        keep = max(1, self.policy.max_variants)
+        self._memory.set(digest, [(created_at, output), *variants][:keep])
+
+    def _prune_expired(self) -> None:
+        with self._lock:
+            if time.monotonic() < self._next_prune:
+                return
+            self._next_prune = time.monotonic() + _PRUNE_INTERVAL_SECONDS
+        prune_generation_cache(
+            older_than=datetime.now(timezone.utc) - timedelta(seconds=self.retention_seconds)
+        )
+
+    def stats(self) -> GenerationCacheStats:
+        with self._lock:
+            return GenerationCacheStats(**self._counts)
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Iterator, TypeVar
+
+from app.metrics import Histogram, observe
+
+T = TypeVar("T")
+
+PRIMARY = "primary"
+HEDGE = "hedge"
+_DONE = object()
+
+
+class DeadlineExceededError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class HedgePolicy:
+    deadline_seconds: float | None = 30.0
+    # Fire a second request once the first has run longer than this percentile of
+    # recent primary latencies (0.95 = p95). None turns hedging off.
+    hedge_percentile: float | None = None
+    min_hedge_delay_seconds: float = 0.25
+    min_samples: int = 20
+    # Latencies are kept per window; the delay comes from the current window once it has
+    # min_samples, else from the previous one, so it follows the backend within two.
+    latency_window_seconds: float = 300.0
+
+
+@dataclass(frozen=True)
+class HedgeStats:
+    requests: int
+    hedged: int
+    primary_wins: int
+    hedge_wins: int
+    deadline_exceeded: int
+    hedge_delay_seconds: float | None
+
+
+# Receives the path (PRIMARY or HEDGE), an event that is set once the other path has
+# won or the caller gave up, and the request deadline in time.monotonic() terms.
+Attempt = Callable[[str, threading.Event, float | None], T]
+
+
+class Hedger:
+    # Bounds every request by a deadline and, optionally, races a second request
+    # against a slow first one. The first path to answer wins; the other is told to
+    # stop through its event. Streams are raced on their first item.
+    def __init__(self, name: str, policy: HedgePolicy, executor: ThreadPoolExecutor) -> None:
+        self.name = name
+        self.policy = policy
+        self._executor = executor
+        self._latencies = Histogram()
+        self._previous_latencies = Histogram()
+        self._window_start = time.monotonic()
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._hedged = 0
+        self._wins = {PRIMARY: 0, HEDGE: 0}
+        self._deadline_exceeded = 0
+
+    def _rotate_latencies(self) -> None:
+        now = time.monotonic()
+        if now - self._window_start < self.policy.latency_window_seconds:
+            return
+        with self._lock:
+            elapsed = now - self._window_start
+            if elapsed < self.policy.latency_window_seconds:
+                return
+            # After a whole idle window the old samples are stale too.
+            idle = elapsed >= 2 * self.policy.latency_window_seconds
+            self._previous_latencies = Histogram() if idle else self._latencies
+            self._latencies = Histogram()
+            self._window_start = now
+
+    def _observe_latency(self, seconds: float) -> None:
+        self._rotate_latencies()
+        self._latencies.observe(seconds)
+
+    def hedge_delay(self) -> float | None:
+        if self.policy.hedge_percentile is None:
+            return None
+        self._rotate_latencies()
+        for latencies in (self._latencies, self._previous_latencies):
+            if latencies.count >= self.policy.min_samples:
+                return max(
+                    self.policy.min_hedge_delay_seconds,
+                    latencies.quantile(self.policy.hedge_percentile),
+                )
+        return None
+
+    def _deadline(self, start: float) -> float | None:
+        if not self.policy.deadline_seconds:
+            return None
+        return start + self.policy.deadline_seconds
+
+    @staticmethod
+    def _timeout(deadline: float | None, hedge_at: float | None) -> float | None:
+        moments = [moment for moment in (deadline, hedge_at) if moment is not None]
+        return max(0.0, min(moments) - time.monotonic()) if moments else None
+
+    def _record_request(self) -> None:
+        with self._lock:
+            self._requests += 1
+
+    def _record_hedge(self, delay: float) -> None:
+        with self._lock:
+            self._hedged += 1
+        observe(f"{self.name}.hedge_delay", delay)
+
+    def _record_win(self, path: str, start: float) -> None:
+        with self._lock:
+            self._wins[path] += 1
+        observe(f"{self.name}.won_by_{path}", time.monotonic() - start)
+
+    def _expired(self) -> DeadlineExceededError:
+        with self._lock:
+            self._deadline_exceeded += 1
+        return DeadlineExceededError(
+            f"No answer within {self.policy.deadline_seconds:g}s. Please try again."
+        )
+
+    def call(self, attempt: Attempt[T]) -> tuple[T, str]:
+        self._record_request()
+        start = time.monotonic()
+        deadline = self._deadline(start)
+        delay = self.hedge_delay()
+        if deadline is None and delay is None:
+            value = self._observe_primary(attempt, start, threading.Event(), None)
+            self._record_win(PRIMARY, start)
+            return value, PRIMARY
+
+        cancelled = {PRIMARY: threading.Event(), HEDGE: threading.Event()}
+        futures: dict[Future, str] = {
+            self._executor.submit(
+                self._observe_primary, attempt, start, cancelled[PRIMARY], deadline
+            ): PRIMARY
+        }
+        hedge_at = None if delay is None else start + delay
+        errors: dict[str, Exception] = {}
+        try:
+            while futures:
+                done, _ = wait(
+                    futures, timeout=self._timeout(deadline, hedge_at), return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    path = futures.pop(future)
+                    try:
+                        value = future.result()
+                    except Exception as error:
+                        errors[path] = error
+                        continue
+                    self._record_win(path, start)
+                    return value, path
+                if done:
+                    continue
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise self._expired()
+                if hedge_at is not None and time.monotonic() >= hedge_at:
+                    self._record_hedge(delay)
+                    futures[
+                        self._executor.submit(attempt, HEDGE, cancelled[HEDGE], deadline)
+                    ] = HEDGE
+                    hedge_at = None
+        finally:
+            for event in cancelled.values():
+                event.set()
+        raise errors.get(PRIMARY) or errors[HEDGE]
+
+    def _observe_primary(
+        self, attempt: Attempt[T], start: float, cancelled: threading.Event, deadline: float | None
+    ) -> T:
+        # Also measured when the hedge already won, so the delay tracks real primary latency.
+        value = attempt(PRIMARY, cancelled, deadline)
+        self._observe_latency(time.monotonic() - start)
+        return value
+
+    def _pump(
+        self,
+        open_stream: Attempt[Iterator[T]],
+        path: str,
+        start: float | None,
+        cancelled: threading.Event,
+        deadline: float | None,
+        items: queue.Queue,
+    ) -> None:
+        try:
+            stream = open_stream(path, cancelled, deadline)
+            try:
+                for item in stream:
+                    if cancelled.is_set():
+                        break
+                    if path == PRIMARY and start is not None:
+                        self._observe_latency(time.monotonic() - start)
+                        start = None
+                    items.put((path, item, None))
+            finally:
+                # Closing the generator closes the underlying HTTP response.
+                close = getattr(stream, "close", None)
+                if close is not None:
+                    close()
+        except Exception as error:
+            items.put((path, _DONE, error))
+            return
+        items.put((path, _DONE, None))
+
+    def stream(self, open_stream: Attempt[Iterator[T]]) -> Iterator[tuple[str, T]]:
+        self._record_request()
+        start = time.monotonic()
+        deadline = self._deadline(start)
+        delay = self.hedge_delay()
+        hedge_at = None if delay is None else start + delay
+        items: queue.Queue = queue.Queue()
+        cancelled = {PRIMARY: threading.Event(), HEDGE: threading.Event()}
+        self._executor.submit(
+            self._pump, open_stream, PRIMARY, start, cancelled[PRIMARY], deadline, items
+        )
+        running = {PRIMARY}
+        winner: str | None = None
+        errors: dict[str, Exception] = {}
+        try:
+            while True:
+                timeout = self._timeout(deadline, hedge_at if winner is None else None)
+                try:
+                    path, item, error = items.get(timeout=timeout)
+                except queue.Empty:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise self._expired()
+                    if hedge_at is None or time.monotonic() < hedge_at:
+                        continue
+                    self._record_hedge(delay)
+                    self._executor.submit(
+                        self._pump, open_stream, HEDGE, None, cancelled[HEDGE], deadline, items
+                    )
+                    running.add(HEDGE)
+                    hedge_at = None
+                    continue
+
+                if winner is None and item is not _DONE:
+                    winner = path
+                    self._record_win(path, start)
+                    for other, event in cancelled.items():
+                        if other != path:
+                            event.set()
+                if winner is not None and path != winner:
+                    continue
+                if item is not _DONE:
+                    yield path, item
+                    continue
+                if error is None:
+                    if winner is None:
+                        # Ended without output; the caller decides what an empty answer means.
+                        self._record_win(path, start)
+                    return
+                if winner is not None:
+                    raise error
+                # A failed path only loses the race; the request fails once none is left.
+                errors[path] = error
+                running.discard(path)
+                if not running:
+                    raise errors.get(PRIMARY) or error
+        finally:
+            for event in cancelled.values():
+                event.set()
+
+    def stats(self) -> HedgeStats:
+        with self._lock:
+            return HedgeStats(
+                requests=self._requests,
+                hedged=self._hedged,
+                primary_wins=self._wins[PRIMARY],
+                hedge_wins=self._wins[HEDGE],
+                deadline_exceeded=self._deadline_exceeded,
+                hedge_delay_seconds=self.hedge_delay(),
+            )
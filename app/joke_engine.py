@@ -1,15 +1,49 @@
 from __future__ import annotations
 
 import os
-from dataclasses import dataclass
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Iterator
 
 import streamlit as st
 
+from app.backends import (
+    FakeBackend,
+    FakeBackendSettings,
+    GenerationBackend,
+    Messages,
+    RateLimitedError,
+    TokenUsage,
+    TransientBackendError,
+)
+from app.generation_cache import CachePolicy, GenerationCache, GenerationKey, normalize_seed
+from app.hedging import HEDGE, Hedger, HedgePolicy, HedgeStats
+from app.metrics import observe, timed, timer
+from app.ratelimit import RateLimiter
+from app.resilience import CircuitBreaker, ResilienceStats, ResilientCaller, RetryPolicy
+from app.singleflight import SingleFlight, SingleFlightStats
+
 try:
-    from openai import OpenAI
+    from openai import (
+        APIConnectionError,
+        APIStatusError,
+        DefaultHttpxClient,
+        OpenAI,
+        RateLimitError,
+    )
 except ImportError:  # pragma: no cover
+    APIConnectionError = APIStatusError = RateLimitError = None
+    DefaultHttpxClient = None
     OpenAI = None
 
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
 
 @dataclass(frozen=True)
 class HumorTemplate:
@@ -20,6 +54,40 @@ class HumorTemplate:
     examples: tuple[tuple[str, str], ...]
 
 
+@dataclass(frozen=True)
+class GenerationResult:
+    text: str
+    model: str
+    cache_hit: bool
+    input_tokens: int | None = None
+    output_tokens: int | None = None
+    latency_ms: int | None = None
+    # Shared from an identical request that was already in flight.
+    coalesced: bool = False
+    # Answered by the hedged second request rather than the first one.
+    hedged: bool = False
+
+
+@dataclass(frozen=True)
+class OpenAISettings:
+    api_key: str | None
+    model: str
+    base_url: str | None
+    timeout_seconds: float
+    connect_timeout_seconds: float
+    max_connections: int
+    max_keepalive_connections: int
+    keepalive_expiry_seconds: float
+    max_retries: int
+    hedge_model: str | None
+
+
+# Bump whenever the system prompt, few-shot layout or output limits change,
+# so cached generations from older prompts are no longer reused.
+PROMPT_VERSION = 1
+MAX_OUTPUT_TOKENS = 180
+
+
 def _secret_or_env(name: str) -> str | None:
     try:
         if name in st.secrets:
@@ -35,8 +103,133 @@ def _secret_or_env(name: str) -> str | None:
     return None
 
 
+def _flag(name: str, default: bool) -> bool:
+    value = _secret_or_env(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+@lru_cache(maxsize=1)
+def openai_settings() -> OpenAISettings:
+    return OpenAISettings(
+        api_key=_secret_or_env("OPENAI_API_KEY"),
+        model=_secret_or_env("OPENAI_MODEL") or "gpt-4o-mini",
+        base_url=_secret_or_env("OPENAI_BASE_URL"),
+        timeout_seconds=float(_secret_or_env("OPENAI_TIMEOUT_SECONDS") or 30),
+        connect_timeout_seconds=float(_secret_or_env("OPENAI_CONNECT_TIMEOUT_SECONDS") or 5),
+        max_connections=int(_secret_or_env("OPENAI_MAX_CONNECTIONS") or 20),
+        max_keepalive_connections=int(_secret_or_env("OPENAI_MAX_KEEPALIVE_CONNECTIONS") or 10),
+        keepalive_expiry_seconds=float(_secret_or_env("OPENAI_KEEPALIVE_EXPIRY_SECONDS") or 60),
+        # Retries happen in llm_guard, which shares backoff and the circuit breaker
+        # across sessions; SDK retries on top would multiply the load on a struggling API.
+        max_retries=int(_secret_or_env("OPENAI_MAX_RETRIES") or 0),
+        hedge_model=_secret_or_env("OPENAI_HEDGE_MODEL"),
+    )
+
+
+def reload_openai_settings() -> None:
+    openai_settings.cache_clear()
+
+
+def _build_openai_client(settings: OpenAISettings) -> OpenAI:
+    http_client = None
+    if httpx is not None and DefaultHttpxClient is not None:
+        http_client = DefaultHttpxClient(
+            timeout=httpx.Timeout(settings.timeout_seconds, connect=settings.connect_timeout_seconds),
+            limits=httpx.Limits(
+                max_connections=settings.max_connections,
+                max_keepalive_connections=settings.max_keepalive_connections,
+                keepalive_expiry=settings.keepalive_expiry_seconds,
+            ),
+        )
+    return OpenAI(
+        api_key=settings.api_key,
+        base_url=settings.base_url,
+        timeout=settings.timeout_seconds,
+        max_retries=settings.max_retries,
+        http_client=http_client,
+    )
+
+
+_client_lock = threading.Lock()
+_client: OpenAI | None = None
+_client_settings: OpenAISettings | None = None
+# Replaced clients may still be serving requests; they are closed once those are over.
+_retired_clients: list[tuple[float, OpenAI]] = []
+
+
+def _close_retired_clients(grace_seconds: float) -> None:
+    now = time.monotonic()
+    keep = []
+    for retired_at, client in _retired_clients:
+        if now - retired_at >= grace_seconds:
+            client.close()
+        else:
+            keep.append((retired_at, client))
+    _retired_clients[:] = keep
+
+
+def _openai_client(settings: OpenAISettings) -> OpenAI:
+    global _client, _client_settings
+
+    with _client_lock:
+        if _client is None or _client_settings != settings:
+            if _client is not None:
+                _retired_clients.append((time.monotonic(), _client))
+            _client = _build_openai_client(settings)
+            _client_settings = settings
+        _close_retired_clients(grace_seconds=settings.timeout_seconds * 2)
+        return _client
+
+
+def get_openai_client() -> OpenAI:
+    if OpenAI is None:
+        raise RuntimeError(
+            "The 'openai' package is not installed. Run: pip install -r requirements.txt"
+        )
+
+    settings = openai_settings()
+    if settings.api_key != _secret_or_env("OPENAI_API_KEY"):
+        # The key was rotated in secrets or the environment.
+        reload_openai_settings()
+        settings = openai_settings()
+    if not settings.api_key:
+        # Do not pin a missing key for the life of the process.
+        reload_openai_settings()
+        raise RuntimeError(
+            "Missing OPENAI_API_KEY. Add it to .streamlit/secrets.toml or environment variables."
+        )
+    return _openai_client(settings)
+
+
 def _default_model() -> str:
-    return _secret_or_env("OPENAI_MODEL") or "gpt-4o-mini"
+    return openai_settings().model
+
+
+def _cache_policy() -> CachePolicy:
+    return CachePolicy(
+        mode=_secret_or_env("JOKE_CACHE_POLICY") or "fresh",
+        max_age_seconds=float(_secret_or_env("JOKE_CACHE_MAX_AGE_SECONDS") or 3600),
+        max_variants=int(_secret_or_env("JOKE_CACHE_MAX_VARIANTS") or 3),
+    )
+
+
+GENERATION_CONCURRENCY = int(_secret_or_env("JOKE_MAX_CONCURRENCY") or 4)
+
+generation_cache = GenerationCache(
+    _cache_policy(),
+    memory_size=int(_secret_or_env("JOKE_CACHE_MEMORY_SIZE") or 1024),
+    memory_ttl_seconds=float(_secret_or_env("JOKE_CACHE_MEMORY_TTL_SECONDS") or 300),
+    retention_seconds=float(_secret_or_env("JOKE_CACHE_RETENTION_DAYS") or 30) * 86400,
+)
+
+COALESCE_REQUESTS = _flag("JOKE_COALESCE_REQUESTS", True)
+SAVE_COALESCED_RESULTS = _flag("JOKE_SAVE_COALESCED", True)
+
+# Identical generations (template, seed, model, prompt version) running at the same
+# time share one model call across every session in the process.
+in_flight: SingleFlight[GenerationKey, GenerationResult] = SingleFlight()
 
 
 def _build_user_prompt(template: HumorTemplate, seed: str) -> str:
@@ -76,54 +269,312 @@ def _extract_output_text(response: object) -> str:
     return "\n".join(chunks).strip()
 
 
-def _call_openai(template: HumorTemplate, seed: str) -> str:
-    if OpenAI is None:
-        raise RuntimeError(
-            "The 'openai' package is not installed. Run: pip install -r requirements.txt"
-        )
+def _extract_usage(response: object) -> TokenUsage:
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return TokenUsage()
+    return TokenUsage(
+        input_tokens=getattr(usage, "input_tokens", None),
+        output_tokens=getattr(usage, "output_tokens", None),
+    )
 
-    api_key = _secret_or_env("OPENAI_API_KEY")
-    if not api_key:
-        raise RuntimeError(
-            "Missing OPENAI_API_KEY. Add it to .streamlit/secrets.toml or environment variables."
-        )
 
-    client = OpenAI(api_key=api_key)
-    try:
-        response = client.responses.create(
-            model=_default_model(),
-            max_output_tokens=180,
-            input=[
+def _elapsed_ms(start: float) -> int:
+    return round((time.perf_counter() - start) * 1000)
+
+
+@timed("llm.prompt_build")
+def _response_input(template: HumorTemplate, seed: str) -> list[dict[str, object]]:
+    return [
+        {
+            "role": "system",
+            "content": [
                 {
-                    "role": "system",
-                    "content": [
-                        {
-                            "type": "input_text",
-                            "text": (
-                                "You are a joke writer. Produce one concise joke that matches "
-                                "the requested humor style."
-                            ),
-                        }
-                    ],
-                },
+                    "type": "input_text",
+                    "text": (
+                        "You are a joke writer. Produce one concise joke that matches "
+                        "the requested humor style."
+                    ),
+                }
+            ],
+        },
+        {
+            "role": "user",
+            "content": [
                 {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "input_text",
-                            "text": _build_user_prompt(template, seed),
-                        }
-                    ],
-                },
+                    "type": "input_text",
+                    "text": _build_user_prompt(template, seed),
+                }
             ],
+        },
+    ]
+
+
+def _retry_after_seconds(error: Exception) -> float | None:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+def _backend_error(error: Exception) -> RuntimeError:
+    if isinstance(error, RuntimeError):
+        return error
+    if RateLimitError is not None and isinstance(error, RateLimitError):
+        return RateLimitedError(
+            f"OpenAI rate limit: {error}", retry_after_seconds=_retry_after_seconds(error)
+        )
+    # APITimeoutError is a subclass of APIConnectionError.
+    if (APIConnectionError is not None and isinstance(error, APIConnectionError)) or (
+        APIStatusError is not None and isinstance(error, APIStatusError) and error.status_code >= 500
+    ):
+        return TransientBackendError(
+            f"OpenAI request failed: {error}", retry_after_seconds=_retry_after_seconds(error)
+        )
+    return RuntimeError(f"OpenAI request failed: {error}")
+
+
+class OpenAIBackend:
+    name = "openai"
+
+    def complete(
+        self, model: str, messages: Messages, max_output_tokens: int
+    ) -> tuple[str, TokenUsage]:
+        client = get_openai_client()
+        try:
+            response = client.responses.create(
+                model=model,
+                max_output_tokens=max_output_tokens,
+                input=messages,
+            )
+        except Exception as error:
+            raise _backend_error(error) from error
+        return _extract_output_text(response), _extract_usage(response)
+
+    def stream(
+        self, model: str, messages: Messages, max_output_tokens: int
+    ) -> Iterator[str | TokenUsage]:
+        client = get_openai_client()
+        try:
+            with client.responses.create(
+                model=model,
+                max_output_tokens=max_output_tokens,
+                input=messages,
+                stream=True,
+            ) as events:
+                for event in events:
+                    event_type = getattr(event, "type", "")
+                    if event_type == "response.output_text.delta":
+                        yield event.delta
+                    elif event_type == "response.completed":
+                        yield _extract_usage(event.response)
+        except Exception as error:
+            raise _backend_error(error) from error
+
+
+def _fake_backend_settings() -> FakeBackendSettings:
+    defaults = FakeBackendSettings()
+    return FakeBackendSettings(
+        latency_ms=float(_secret_or_env("FAKE_LLM_LATENCY_MS") or defaults.latency_ms),
+        jitter_ms=float(_secret_or_env("FAKE_LLM_JITTER_MS") or defaults.jitter_ms),
+        distribution=_secret_or_env("FAKE_LLM_DISTRIBUTION") or defaults.distribution,
+        first_token_fraction=float(
+            _secret_or_env("FAKE_LLM_FIRST_TOKEN_FRACTION") or defaults.first_token_fraction
+        ),
+        rate_limit_probability=float(
+            _secret_or_env("FAKE_LLM_RATE_LIMIT_PROBABILITY") or defaults.rate_limit_probability
+        ),
+        error_probability=float(
+            _secret_or_env("FAKE_LLM_ERROR_PROBABILITY") or defaults.error_probability
+        ),
+        retry_after_seconds=float(
+            _secret_or_env("FAKE_LLM_RETRY_AFTER_SECONDS") or defaults.retry_after_seconds
+        ),
+        random_seed=int(_secret_or_env("FAKE_LLM_RANDOM_SEED") or defaults.random_seed),
+    )
+
+
+@lru_cache(maxsize=1)
+def _configured_backend() -> GenerationBackend:
+    name = _secret_or_env("JOKE_BACKEND") or "openai"
+    if name == "openai":
+        return OpenAIBackend()
+    if name == "fake":
+        return FakeBackend(_fake_backend_settings())
+    raise RuntimeError(f"Unknown JOKE_BACKEND: {name} (expected 'openai' or 'fake').")
+
+
+_backend_override: GenerationBackend | None = None
+
+
+def get_backend() -> GenerationBackend:
+    return _backend_override or _configured_backend()
+
+
+def set_backend(backend: GenerationBackend | None) -> None:
+    # Overrides JOKE_BACKEND for the rest of the process; None goes back to the configured one.
+    global _backend_override
+
+    _backend_override = backend
+    _configured_backend.cache_clear()
+
+
+def _estimate_tokens(template: HumorTemplate, seed: str) -> int:
+    # Roughly four characters per token, plus the system prompt and the output budget.
+    return len(_build_user_prompt(template, seed)) // 4 + 40 + MAX_OUTPUT_TOKENS
+
+
+def _llm_guard() -> ResilientCaller:
+    requests_per_minute = _secret_or_env("OPENAI_REQUESTS_PER_MINUTE")
+    tokens_per_minute = _secret_or_env("OPENAI_TOKENS_PER_MINUTE")
+    limiter = None
+    if requests_per_minute or tokens_per_minute:
+        limiter = RateLimiter(
+            requests_per_minute=float(requests_per_minute) if requests_per_minute else None,
+            tokens_per_minute=float(tokens_per_minute) if tokens_per_minute else None,
         )
-    except Exception as error:  # pragma: no cover
-        raise RuntimeError(f"OpenAI request failed: {error}") from error
+    defaults = RetryPolicy()
+    return ResilientCaller(
+        limiter=limiter,
+        retry=RetryPolicy(
+            max_attempts=int(_secret_or_env("OPENAI_MAX_ATTEMPTS") or defaults.max_attempts),
+            base_delay_seconds=float(
+                _secret_or_env("OPENAI_RETRY_BASE_SECONDS") or defaults.base_delay_seconds
+            ),
+            max_delay_seconds=float(
+                _secret_or_env("OPENAI_RETRY_MAX_SECONDS") or defaults.max_delay_seconds
+            ),
+        ),
+        breaker=CircuitBreaker(
+            failure_threshold=int(_secret_or_env("OPENAI_BREAKER_FAILURES") or 5),
+            reset_seconds=float(_secret_or_env("OPENAI_BREAKER_RESET_SECONDS") or 30),
+        ),
+    )
+
+
+# One limiter, retry budget and circuit breaker per process, shared by every session.
+llm_guard = _llm_guard()
+
+
+def llm_call_stats() -> ResilienceStats:
+    return llm_guard.stats()
+
+
+def _hedge_policy() -> HedgePolicy:
+    defaults = HedgePolicy()
+    percentile = _secret_or_env("JOKE_HEDGE_PERCENTILE")
+    return HedgePolicy(
+        # 0 turns the deadline off.
+        deadline_seconds=float(_secret_or_env("JOKE_DEADLINE_SECONDS") or defaults.deadline_seconds)
+        or None,
+        hedge_percentile=float(percentile) / 100 if percentile else None,
+        min_hedge_delay_seconds=float(
+            _secret_or_env("JOKE_HEDGE_MIN_DELAY_SECONDS") or defaults.min_hedge_delay_seconds
+        ),
+        latency_window_seconds=float(
+            _secret_or_env("JOKE_HEDGE_WINDOW_SECONDS") or defaults.latency_window_seconds
+        ),
+    )
+
+
+# Model calls run here so a request can stop waiting at its deadline or race a hedge;
+# a losing call finishes (or, for streams, is closed) in the background.
+_llm_executor = ThreadPoolExecutor(
+    max_workers=max(8, openai_settings().max_connections * 2), thread_name_prefix="joke-llm"
+)
+llm_hedger = Hedger("llm", _hedge_policy(), _llm_executor)
+stream_hedger = Hedger("llm.stream", _hedge_policy(), _llm_executor)
+
+
+def hedging_stats() -> dict[str, HedgeStats]:
+    return {"calls": llm_hedger.stats(), "streams": stream_hedger.stats()}
+
+
+def _path_model(model: str, path: str) -> str:
+    if path == HEDGE:
+        return openai_settings().hedge_model or model
+    return model
+
+
+def coalescing_stats() -> SingleFlightStats:
+    return in_flight.stats()
+
+
+def should_save(result: GenerationResult) -> bool:
+    return SAVE_COALESCED_RESULTS or not result.coalesced
+
 
-    output = _extract_output_text(response)
+def _shared_result(result: GenerationResult, start: float) -> GenerationResult:
+    # The tokens were spent by the request that made the call, so they are not counted twice.
+    observe("generation.coalesced_wait", time.perf_counter() - start)
+    return replace(
+        result,
+        coalesced=True,
+        input_tokens=None,
+        output_tokens=None,
+        latency_ms=_elapsed_ms(start),
+    )
+
+
+@timed("llm.response")
+def _call_backend(
+    template: HumorTemplate,
+    seed: str,
+    model: str,
+    *,
+    cancelled: threading.Event | None = None,
+    deadline: float | None = None,
+) -> tuple[str, TokenUsage]:
+    messages = _response_input(template, seed)
+    output, usage = llm_guard.call(
+        lambda: get_backend().complete(model, messages, MAX_OUTPUT_TOKENS),
+        tokens=_estimate_tokens(template, seed),
+        deadline=deadline,
+        cancelled=cancelled,
+    )
+    output = output.strip()
     if not output:
-        raise RuntimeError("OpenAI returned an empty response.")
-    return output
+        raise RuntimeError("The model returned an empty response.")
+    return output, usage
+
+
+def _hedged_call(
+    template: HumorTemplate, seed: str, model: str
+) -> tuple[str, TokenUsage, str, bool]:
+    def attempt(
+        path: str, cancelled: threading.Event, deadline: float | None
+    ) -> tuple[str, TokenUsage, str]:
+        path_model = _path_model(model, path)
+        output, usage = _call_backend(
+            template, seed, path_model, cancelled=cancelled, deadline=deadline
+        )
+        return output, usage, path_model
+
+    (output, usage, used_model), path = llm_hedger.call(attempt)
+    return output, usage, used_model, path == HEDGE
+
+
+def _stream_backend(
+    template: HumorTemplate,
+    seed: str,
+    model: str,
+    *,
+    cancelled: threading.Event | None = None,
+    deadline: float | None = None,
+) -> Iterator[str | TokenUsage]:
+    messages = _response_input(template, seed)
+    return llm_guard.stream(
+        lambda: get_backend().stream(model, messages, MAX_OUTPUT_TOKENS),
+        tokens=_estimate_tokens(template, seed),
+        deadline=deadline,
+        cancelled=cancelled,
+    )
 
 
 def echo_input(text: str) -> str:
@@ -387,7 +838,204 @@ def get_template(template_key: str) -> HumorTemplate:
     return TEMPLATES_BY_KEY[template_key]
 
 
-def generate_joke(template_key: str, user_input: str, add_on: str) -> str:
+def estimate_request_tokens(template_key: str, user_input: str, add_on: str) -> int:
+    return _estimate_tokens(get_template(template_key), extend_input(user_input, add_on))
+
+
+def _generate(
+    template: HumorTemplate,
+    seed: str,
+    key: GenerationKey,
+    cache_policy: CachePolicy | None,
+    start: float,
+) -> GenerationResult:
+    model = key.model
+    with timer("generation.cache_lookup"):
+        cached = generation_cache.lookup(key, cache_policy)
+    if cached is not None:
+        return GenerationResult(
+            text=cached, model=model, cache_hit=True, latency_ms=_elapsed_ms(start)
+        )
+
+    output, usage, model, hedged = _hedged_call(template, seed, model)
+    latency_ms = _elapsed_ms(start)
+    generation_cache.store(replace(key, model=model), output, cache_policy)
+    return GenerationResult(
+        text=output,
+        model=model,
+        cache_hit=False,
+        input_tokens=usage.input_tokens,
+        output_tokens=usage.output_tokens,
+        latency_ms=latency_ms,
+        hedged=hedged,
+    )
+
+
+@timed("generation.total")
+def generate_joke_result(
+    template_key: str,
+    user_input: str,
+    add_on: str,
+    *,
+    cache_policy: CachePolicy | None = None,
+) -> GenerationResult:
+    start = time.perf_counter()
     template = get_template(template_key)
     seed = extend_input(user_input, add_on)
-    return _call_openai(template, seed)
+    model = _default_model()
+    key = GenerationKey(template.key, normalize_seed(seed), model, PROMPT_VERSION)
+    if not COALESCE_REQUESTS:
+        return _generate(template, seed, key, cache_policy, start)
+
+    result, shared = in_flight.do(key, lambda: _generate(template, seed, key, cache_policy, start))
+    return _shared_result(result, start) if shared else result
+
+
+class JokeStream:
+    def __init__(
+        self,
+        template_key: str,
+        user_input: str,
+        add_on: str,
+        *,
+        cache_policy: CachePolicy | None = None,
+    ) -> None:
+        self.template = get_template(template_key)
+        self.seed = extend_input(user_input, add_on)
+        self.model = _default_model()
+        self.cache_policy = cache_policy
+        self.text = ""
+        self.cache_hit = False
+        self.coalesced = False
+        self.hedged = False
+        self.usage = TokenUsage()
+        self.first_token_seconds: float | None = None
+        self.total_seconds: float | None = None
+
+    @property
+    def latency_ms(self) -> int | None:
+        return None if self.total_seconds is None else round(self.total_seconds * 1000)
+
+    def result(self) -> GenerationResult:
+        return GenerationResult(
+            text=self.text,
+            model=self.model,
+            cache_hit=self.cache_hit,
+            input_tokens=self.usage.input_tokens,
+            output_tokens=self.usage.output_tokens,
+            latency_ms=self.latency_ms,
+            coalesced=self.coalesced,
+            hedged=self.hedged,
+        )
+
+    def __iter__(self) -> Iterator[str]:
+        start = time.perf_counter()
+        key = GenerationKey(self.template.key, normalize_seed(self.seed), self.model, PROMPT_VERSION)
+        if not COALESCE_REQUESTS:
+            yield from self._generate(key, start)
+            return
+
+        flight, leader = in_flight.join(key)
+        if not leader:
+            # Identical stream already running elsewhere: wait for it and show the whole joke.
+            shared = _shared_result(flight.wait(), start)
+            self.coalesced = True
+            self.cache_hit = shared.cache_hit
+            self.text = shared.text
+            self.first_token_seconds = time.perf_counter() - start
+            yield shared.text
+            self.total_seconds = time.perf_counter() - start
+            return
+
+        try:
+            yield from self._generate(key, start)
+        except BaseException as error:
+            in_flight.resolve(key, flight, error=error)
+            raise
+        in_flight.resolve(key, flight, self.result())
+
+    def _generate(self, key: GenerationKey, start: float) -> Iterator[str]:
+        with timer("generation.cache_lookup"):
+            cached = generation_cache.lookup(key, self.cache_policy)
+        if cached is not None:
+            self.cache_hit = True
+            self.text = cached
+            self.first_token_seconds = time.perf_counter() - start
+            yield cached
+            self.total_seconds = time.perf_counter() - start
+            return
+
+        def open_stream(
+            path: str, cancelled: threading.Event, deadline: float | None
+        ) -> Iterator[str | TokenUsage]:
+            return _stream_backend(
+                self.template,
+                self.seed,
+                _path_model(key.model, path),
+                cancelled=cancelled,
+                deadline=deadline,
+            )
+
+        chunks: list[str] = []
+        for path, delta in stream_hedger.stream(open_stream):
+            self.hedged = path == HEDGE
+            self.model = _path_model(key.model, path)
+            if isinstance(delta, TokenUsage):
+                self.usage = delta
+                continue
+            if self.first_token_seconds is None:
+                self.first_token_seconds = time.perf_counter() - start
+                observe("llm.stream_first_token", self.first_token_seconds)
+            chunks.append(delta)
+            yield delta
+
+        self.text = "".join(chunks).strip()
+        self.total_seconds = time.perf_counter() - start
+        observe("llm.stream_total", self.total_seconds)
+        if not self.text:
+            raise RuntimeError("The model returned an empty response.")
+        generation_cache.store(replace(key, model=self.model), self.text, self.cache_policy)
+
+
+def stream_joke(
+    template_key: str,
+    user_input: str,
+    add_on: str,
+    *,
+    cache_policy: CachePolicy | None = None,
+) -> JokeStream:
+    return JokeStream(template_key, user_input, add_on, cache_policy=cache_policy)
+
+
+def generate_joke(template_key: str, user_input: str, add_on: str) -> str:
+    return generate_joke_result(template_key, user_input, add_on).text
+
+
+def generate_jokes_concurrently(
+    template_keys: list[str],
+    user_input: str,
+    add_on: str,
+    *,
+    max_workers: int | None = None,
+    cache_policy: CachePolicy | None = None,
+) -> Iterator[tuple[str, GenerationResult | RuntimeError]]:
+    if not template_keys:
+        return
+
+    workers = max(1, min(max_workers or GENERATION_CONCURRENCY, len(template_keys)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="joke-generate") as executor:
+        futures = {
+            executor.submit(
+                generate_joke_result,
+                template_key,
+                user_input,
+                add_on,
+                cache_policy=cache_policy,
+            ): template_key
+            for template_key in template_keys
+        }
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except RuntimeError as error:
+                yield futures[future], error
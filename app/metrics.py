@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Iterator, ParamSpec, TypeVar
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+# Log-spaced buckets from 100 microseconds to about two minutes, four per doubling,
+# so any reported percentile is within roughly 20% of the true value.
+_MIN_SECONDS = 0.0001
+_GROWTH = 2 ** 0.25
+_BUCKETS = 82
+_LOG_GROWTH = math.log(_GROWTH)
+QUANTILES = (0.5, 0.95, 0.99)
+PROMETHEUS_METRIC = "joke_studio_operation_seconds"
+
+
+@dataclass(frozen=True)
+class TimingSummary:
+    name: str
+    count: int
+    total_seconds: float
+    p50_seconds: float
+    p95_seconds: float
+    p99_seconds: float
+    max_seconds: float
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.total_seconds / self.count if self.count else 0.0
+
+
+class Histogram:
+    def __init__(self) -> None:
+        self._counts = [0] * _BUCKETS
+        self._count = 0
+        self._total = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _bucket(seconds: float) -> int:
+        if seconds <= _MIN_SECONDS:
+            return 0
+        return min(_BUCKETS - 1, math.ceil(math.log(seconds / _MIN_SECONDS) / _LOG_GROWTH))
+
+    def observe(self, seconds: float) -> None:
+        bucket = self._bucket(seconds)
+        with self._lock:
+            self._counts[bucket] += 1
+            self._count += 1
+            self._total += seconds
+            self._max = max(self._max, seconds)
+
+    def _quantile(self, counts: list[int], count: int, maximum: float, quantile: float) -> float:
+        if not count:
+            return 0.0
+        rank = quantile * count
+        seen = 0
+        for bucket, bucket_count in enumerate(counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(maximum, _MIN_SECONDS * _GROWTH**bucket)
+        return maximum
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def quantile(self, quantile: float) -> float:
+        with self._lock:
+            counts = list(self._counts)
+            count, maximum = self._count, self._max
+        return self._quantile(counts, count, maximum, quantile)
+
+    def summary(self, name: str) -> TimingSummary:
+        with self._lock:
+            counts = list(self._counts)
+            count, total, maximum = self._count, self._total, self._max
+        p50, p95, p99 = (self._quantile(counts, count, maximum, q) for q in QUANTILES)
+        return TimingSummary(name, count, total, p50, p95, p99, maximum)
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._histograms: dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float) -> None:
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, Histogram())
+        histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def timed(self, name: str) -> Callable[[Callable[P, R]], Callable[P, R]]:
+        def decorator(function: Callable[P, R]) -> Callable[P, R]:
+            @wraps(function)
+            def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - start)
+
+            return wrapper
+
+        return decorator
+
+    def snapshot(self) -> list[TimingSummary]:
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+        return [histogram.summary(name) for name, histogram in histograms]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+    def prometheus_text(self) -> str:
+        lines = [
+            f"# HELP {PROMETHEUS_METRIC} Time spent in instrumented operations.",
+            f"# TYPE {PROMETHEUS_METRIC} summary",
+        ]
+        for summary in self.snapshot():
+            label = f'operation="{summary.name}"'
+            for quantile, value in zip(
+                QUANTILES, (summary.p50_seconds, summary.p95_seconds, summary.p99_seconds)
+            ):
+                lines.append(f'{PROMETHEUS_METRIC}{{{label},quantile="{quantile}"}} {value:.6f}')
+            lines.append(f"{PROMETHEUS_METRIC}_sum{{{label}}} {summary.total_seconds:.6f}")
+            lines.append(f"{PROMETHEUS_METRIC}_count{{{label}}} {summary.count}")
+        return "\n".join(lines) + "\n"
+
+    def json_text(self) -> str:
+        return json.dumps([asdict(summary) for summary in self.snapshot()], indent=2)
+
+
+metrics = MetricsRegistry()
+observe = metrics.observe
+timer = metrics.timer
+timed = metrics.timed
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path == "/metrics":
+            body, content_type = metrics.prometheus_text(), "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            body, content_type = metrics.json_text(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        payload = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+_server: ThreadingHTTPServer | None = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    global _server
+
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            threading.Thread(
+                target=_server.serve_forever, name="metrics-server", daemon=True
+            ).start()
+        return _server
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Engine,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    func,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateColumn
+
+_schema_metadata = MetaData()
+
+schema_version = Table(
+    "schema_version",
+    _schema_metadata,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+# Arbitrary constant key for pg_advisory_xact_lock so concurrent app processes migrate one at a time.
+_PG_MIGRATION_LOCK_KEY = 4_815_162_342
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    apply: Callable[[Connection, MetaData], None]
+
+
+def add_column(connection: Connection, table_name: str, column: Column) -> None:
+    existing = {item["name"] for item in inspect(connection).get_columns(table_name)}
+    if column.name in existing:
+        return
+    ddl = CreateColumn(column).compile(dialect=connection.dialect)
+    connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {ddl}"))
+
+
+def create_index(connection: Connection, index: Index) -> None:
+    index.create(connection, checkfirst=True)
+
+
+_SQLITE_SEARCH_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS jokes_fts USING fts5(
+        user_input, add_on, generated_joke, template_name,
+        content='jokes', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS jokes_fts_insert AFTER INSERT ON jokes BEGIN
+        INSERT INTO jokes_fts(rowid, user_input, add_on, generated_joke, template_name)
+        VALUES (new.id, new.user_input, new.add_on, new.generated_joke, new.template_name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS jokes_fts_delete AFTER DELETE ON jokes BEGIN
+        INSERT INTO jokes_fts(jokes_fts, rowid, user_input, add_on, generated_joke, template_name)
+        VALUES ('delete', old.id, old.user_input, old.add_on, old.generated_joke, old.template_name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS jokes_fts_update AFTER UPDATE ON jokes BEGIN
+        INSERT INTO jokes_fts(jokes_fts, rowid, user_input, add_on, generated_joke, template_name)
+        VALUES ('delete', old.id, old.user_input, old.add_on, old.generated_joke, old.template_name);
+        INSERT INTO jokes_fts(rowid, user_input, add_on, generated_joke, template_name)
+        VALUES (new.id, new.user_input, new.add_on, new.generated_joke, new.template_name);
+    END
+    """,
+)
+
+
+_PG_SEARCH_INDEX_DDL = """
+    CREATE INDEX IF NOT EXISTS ix_jokes_search ON jokes USING gin (
+        to_tsvector(
+            'simple'::regconfig,
+            user_input || ' ' || add_on || ' ' || generated_joke || ' ' || template_name
+        )
+    )
+"""
+
+
+def _create_base_tables(connection: Connection, metadata: MetaData) -> None:
+    metadata.create_all(connection)
+
+
+def _create_search_index(connection: Connection, metadata: MetaData) -> None:
+    if connection.dialect.name != "sqlite":
+        connection.execute(text(_PG_SEARCH_INDEX_DDL))
+        return
+
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'jokes_fts'")
+    ).first()
+    for statement in _SQLITE_SEARCH_DDL:
+        connection.execute(text(statement))
+    if exists is None:
+        connection.execute(text("INSERT INTO jokes_fts(jokes_fts) VALUES ('rebuild')"))
+
+
+def _seed_joke_stats(connection: Connection, metadata: MetaData) -> None:
+    connection.execute(
+        text(
+            """
+            INSERT INTO joke_stats (id, total, latest_created_at)
+            SELECT 1, (SELECT count(id) FROM jokes), (SELECT max(created_at) FROM jokes)
+            WHERE NOT EXISTS (SELECT 1 FROM joke_stats WHERE id = 1)
+            """
+        )
+    )
+
+
+def _create_listing_indexes(connection: Connection, metadata: MetaData) -> None:
+    indexes = {index.name: index for index in metadata.tables["jokes"].indexes}
+    create_index(connection, indexes["ix_jokes_template_key_id"])
+    create_index(connection, indexes["ix_jokes_created_at"])
+
+
+def _add_generation_metadata(connection: Connection, metadata: MetaData) -> None:
+    jokes = metadata.tables["jokes"]
+    for name in ("model", "input_tokens", "output_tokens", "latency_ms", "cache_hit"):
+        add_column(connection, "jokes", jokes.c[name])
+
+
+def _drop_template_key_index(connection: Connection, metadata: MetaData) -> None:
+    # ix_jokes_template_key_id starts with template_key, so the single-column index only
+    # cost every insert an extra write (and SQLite's planner kept preferring it).
+    connection.execute(text("DROP INDEX IF EXISTS ix_jokes_template_key"))
+
+
+def _add_coalesced_flag(connection: Connection, metadata: MetaData) -> None:
+    add_column(connection, "jokes", metadata.tables["jokes"].c.coalesced)
+
+
+# Append new migrations with the next version number; never edit or reorder applied ones.
+MIGRATIONS: tuple[Migration, ...] = (
+    Migration(1, "Create jokes, joke_stats and generation_cache tables", _create_base_tables),
+    Migration(2, "Create full-text search index for jokes", _create_search_index),
+    Migration(3, "Seed joke_stats from existing jokes", _seed_joke_stats),
+    Migration(4, "Add (template_key, id desc) and created_at indexes to jokes", _create_listing_indexes),
+    Migration(5, "Add model, token usage, latency and cache hit columns to jokes", _add_generation_metadata),
+    Migration(6, "Drop ix_jokes_template_key, a prefix of ix_jokes_template_key_id", _drop_template_key_index),
+    Migration(7, "Add coalesced flag to jokes", _add_coalesced_flag),
+)
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def current_version(connection: Connection) -> int:
+    return int(connection.scalar(select(func.max(schema_version.c.version))) or 0)
+
+
+def run_migrations(engine: Engine, metadata: MetaData) -> int:
+    _schema_metadata.create_all(engine)
+    with engine.connect() as connection:
+        version = current_version(connection)
+
+    for migration in MIGRATIONS:
+        if migration.version <= version:
+            continue
+        with engine.begin() as connection:
+            if connection.dialect.name == "postgresql":
+                connection.execute(
+                    text("SELECT pg_advisory_xact_lock(:key)"), {"key": _PG_MIGRATION_LOCK_KEY}
+                )
+                if current_version(connection) >= migration.version:
+                    continue
+            migration.apply(connection, metadata)
+            connection.execute(
+                schema_version.insert().values(
+                    version=migration.version,
+                    description=migration.description,
+                    applied_at=datetime.now(timezone.utc),
+                )
+            )
+        version = migration.version
+    return version
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute: float, capacity: float | None = None) -> None:
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._level = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        # Takes the amount now, going into debt if needed; returns how long the caller must wait.
+        with self._lock:
+            now = time.monotonic()
+            self._level = min(self.capacity, self._level + (now - self._updated) * self.rate_per_second)
+            self._updated = now
+            self._level -= amount
+            if self._level >= 0:
+                return 0.0
+            return -self._level / self.rate_per_second
+
+
+@dataclass(frozen=True)
+class RateLimiterStats:
+    acquired: int
+    throttled: int
+    total_wait_seconds: float
+    max_wait_seconds: float
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        *,
+        requests_per_minute: float | None = None,
+        tokens_per_minute: float | None = None,
+    ) -> None:
+        self._requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._lock = threading.Lock()
+        self._acquired = 0
+        self._throttled = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def acquire(self, tokens: int = 0) -> float:
+        wait = 0.0
+        if self._requests is not None:
+            wait = max(wait, self._requests.reserve(1))
+        if self._tokens is not None and tokens:
+            wait = max(wait, self._tokens.reserve(tokens))
+
+        with self._lock:
+            self._acquired += 1
+            if wait > 0:
+                self._throttled += 1
+                self._total_wait += wait
+                self._max_wait = max(self._max_wait, wait)
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def stats(self) -> RateLimiterStats:
+        with self._lock:
+            return RateLimiterStats(
+                acquired=self._acquired,
+                throttled=self._throttled,
+                total_wait_seconds=self._total_wait,
+                max_wait_seconds=self._max_wait,
+            )
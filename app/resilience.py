@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from concurrent.futures import CancelledError
+from dataclasses import dataclass
+from typing import Callable, Iterator, TypeVar
+
+from app.backends import RateLimitedError, TransientBackendError
+from app.metrics import observe
+from app.ratelimit import RateLimiter, RateLimiterStats
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    # Opens after `failure_threshold` transient failures in a row and fails fast until
+    # `reset_seconds` have passed; then one probe call decides whether it closes again.
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._probing or time.monotonic() - self._opened_at >= self.reset_seconds:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        # Returns True when this call is the half-open probe.
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            if not self._probing and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._probing = True
+                return True
+            retry_in = max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at))
+        raise CircuitOpenError(
+            f"The joke provider is failing; not calling it for another {retry_in:.0f}s."
+        )
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def release_probe(self) -> None:
+        # The probe ended without an answer either way (a closed stream, a rerun), so
+        # the next call may probe again.
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int = 4
+    base_delay_seconds: float = 0.5
+    max_delay_seconds: float = 20.0
+
+    def delay(self, attempt: int, retry_after_seconds: float | None, rng: random.Random) -> float:
+        # Full jitter, but never sooner than the provider's Retry-After.
+        ceiling = min(self.max_delay_seconds, self.base_delay_seconds * 2**attempt)
+        delay = rng.uniform(0, ceiling)
+        if retry_after_seconds is not None:
+            delay = max(delay, retry_after_seconds)
+        return delay
+
+
+@dataclass(frozen=True)
+class ResilienceStats:
+    calls: int
+    attempts: int
+    retries: int
+    rate_limited: int
+    transient_errors: int
+    circuit_rejections: int
+    circuit_state: str
+    total_backoff_seconds: float
+    limiter: RateLimiterStats | None
+
+
+class ResilientCaller:
+    def __init__(
+        self,
+        *,
+        limiter: RateLimiter | None = None,
+        retry: RetryPolicy | None = None,
+        breaker: CircuitBreaker | None = None,
+    ) -> None:
+        self.limiter = limiter
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self._random = random.Random()
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._attempts = 0
+        self._retries = 0
+        self._rate_limited = 0
+        self._transient_errors = 0
+        self._circuit_rejections = 0
+        self._total_backoff = 0.0
+
+    def _before_attempt(self, tokens: int, cancelled: threading.Event | None) -> bool:
+        if cancelled is not None and cancelled.is_set():
+            raise CancelledError()
+        try:
+            probe = self.breaker.allow()
+        except CircuitOpenError:
+            with self._lock:
+                self._circuit_rejections += 1
+            raise
+        try:
+            if self.limiter is not None:
+                observe("llm.queue_wait", self.limiter.acquire(tokens))
+        except BaseException:
+            if probe:
+                self.breaker.release_probe()
+            raise
+        with self._lock:
+            self._attempts += 1
+        return probe
+
+    def _record_error(self, error: TransientBackendError) -> None:
+        rate_limited = isinstance(error, RateLimitedError)
+        with self._lock:
+            if rate_limited:
+                self._rate_limited += 1
+            else:
+                self._transient_errors += 1
+        # A 429 means the provider is up but busy, so it counts as an answer for the breaker.
+        if rate_limited:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+    def _backoff_or_raise(
+        self, error: TransientBackendError, attempt: int, deadline: float | None
+    ) -> None:
+        self._record_error(error)
+        if attempt + 1 >= self.retry.max_attempts:
+            raise error
+        # Retry-After is honored in full; one longer than the backoff cap fails instead.
+        if (
+            error.retry_after_seconds is not None
+            and error.retry_after_seconds > self.retry.max_delay_seconds
+        ):
+            raise error
+
+        with self._lock:
+            delay = self.retry.delay(attempt, error.retry_after_seconds, self._random)
+        # No point sleeping past the caller's deadline (time.monotonic()).
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            raise error
+        with self._lock:
+            self._retries += 1
+            self._total_backoff += delay
+        observe("llm.retry_backoff", delay)
+        time.sleep(delay)
+
+    def call(
+        self,
+        operation: Callable[[], T],
+        *,
+        tokens: int = 0,
+        deadline: float | None = None,
+        cancelled: threading.Event | None = None,
+    ) -> T:
+        with self._lock:
+            self._calls += 1
+        attempt = 0
+        while True:
+            probe = self._before_attempt(tokens, cancelled)
+            try:
+                result = operation()
+            except TransientBackendError as error:
+                self._backoff_or_raise(error, attempt, deadline)
+                attempt += 1
+                continue
+            except Exception:
+                # The provider answered, even if it rejected the request.
+                self.breaker.record_success()
+                raise
+            except BaseException:
+                if probe:
+                    self.breaker.release_probe()
+                raise
+            self.breaker.record_success()
+            return result
+
+    def stream(
+        self,
+        open_stream: Callable[[], Iterator[T]],
+        *,
+        tokens: int = 0,
+        deadline: float | None = None,
+        cancelled: threading.Event | None = None,
+    ) -> Iterator[T]:
+        # A stream is only retried before its first item; after that the caller has
+        # already shown partial output.
+        with self._lock:
+            self._calls += 1
+        attempt = 0
+        while True:
+            probe = self._before_attempt(tokens, cancelled)
+            started = False
+            try:
+                for item in open_stream():
+                    started = True
+                    yield item
+            except TransientBackendError as error:
+                if started:
+                    self._record_error(error)
+                    raise
+                self._backoff_or_raise(error, attempt, deadline)
+                attempt += 1
+                continue
+            except Exception:
+                self.breaker.record_success()
+                raise
+            except BaseException:
+                # Closed early (deadline, lost hedge, Streamlit rerun): neither outcome.
+                if probe:
+                    self.breaker.release_probe()
+                raise
+            self.breaker.record_success()
+            return
+
+    def stats(self) -> ResilienceStats:
+        with self._lock:
+            return ResilienceStats(
+                calls=self._calls,
+                attempts=self._attempts,
+                retries=self._retries,
+                rate_limited=self._rate_limited,
+                transient_errors=self._transient_errors,
+                circuit_rejections=self._circuit_rejections,
+                circuit_state=self.breaker.state,
+                total_backoff_seconds=self._total_backoff,
+                limiter=self.limiter.stats() if self.limiter is not None else None,
+            )
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Callable, Generic, Hashable, TypeVar, cast
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class Flight(Generic[V]):
+    def __init__(self) -> None:
+        self._done = threading.Event()
+        self._value: V | None = None
+        self._error: BaseException | None = None
+
+    def wait(self, timeout: float | None = None) -> V:
+        if not self._done.wait(timeout):
+            raise TimeoutError("Timed out waiting for an identical request in flight.")
+        if self._error is not None:
+            raise self._error
+        return cast(V, self._value)
+
+
+@dataclass(frozen=True)
+class SingleFlightStats:
+    leaders: int
+    followers: int
+    in_flight: int
+
+    @property
+    def coalesced_rate(self) -> float:
+        requests = self.leaders + self.followers
+        return self.followers / requests if requests else 0.0
+
+
+class SingleFlight(Generic[K, V]):
+    # Concurrent requests for the same key share the first caller's work: the leader
+    # runs it, followers wait for its result (or its exception).
+    def __init__(self) -> None:
+        self._flights: dict[K, Flight[V]] = {}
+        self._lock = threading.Lock()
+        self._leaders = 0
+        self._followers = 0
+
+    def join(self, key: K) -> tuple[Flight[V], bool]:
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self._followers += 1
+                return flight, False
+            flight = self._flights[key] = Flight()
+            self._leaders += 1
+            return flight, True
+
+    def resolve(
+        self,
+        key: K,
+        flight: Flight[V],
+        value: V | None = None,
+        error: BaseException | None = None,
+    ) -> None:
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        if error is not None and not isinstance(error, Exception):
+            # The leader was interrupted (a closed generator, a Streamlit rerun); that
+            # signal belongs to its own thread, not to the followers.
+            error = RuntimeError("An identical request in flight was cancelled. Please try again.")
+        flight._value = value
+        flight._error = error
+        flight._done.set()
+
+    def do(self, key: K, function: Callable[[], V]) -> tuple[V, bool]:
+        flight, leader = self.join(key)
+        if not leader:
+            return flight.wait(), True
+        try:
+            value = function()
+        except BaseException as error:
+            self.resolve(key, flight, error=error)
+            raise
+        self.resolve(key, flight, value)
+        return value, False
+
+    def stats(self) -> SingleFlightStats:
+        with self._lock:
+            return SingleFlightStats(
+                leaders=self._leaders,
+                followers=self._followers,
+                in_flight=len(self._flights),
+            )
@@ -0,0 +1 @@
+# Benchmark scripts. Run from the repository root with: python -m benchmarks.<name>
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PAGES = {
+    "home": ROOT / "Home.py",
+    "generate": ROOT / "pages" / "1_Generate_Joke.py",
+    "library": ROOT / "pages" / "2_Joke_Library.py",
+}
+_SEARCHES = ("", "printer", "coffee monday", "zeppelin", "pizza")
+
+
+class _StatementCounter:
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, *args) -> None:
+        self.count += 1
+
+
+def _parse_mix(values: list[str]) -> dict[str, float]:
+    mix = {}
+    for value in values:
+        page, _, weight = value.partition("=")
+        if page not in PAGES:
+            raise SystemExit(f"Unknown page in --mix: {page} (expected one of {', '.join(PAGES)})")
+        mix[page] = float(weight or 1)
+    return mix
+
+
+def _run_session(session_id: int, settings: dict) -> list[dict]:
+    # Runs in its own process: AppTest swaps process-wide Streamlit state on every
+    # run, so simulated sessions cannot share a process and run at the same time.
+    from sqlalchemy import event
+    from streamlit.testing.v1 import AppTest
+
+    from app import database
+
+    # Import and migrate before measuring, as a running server would have.
+    for module in ("app.joke_engine", "app.ui", "pandas", "pyarrow"):
+        importlib.import_module(module)
+    database.init_db()
+    counter = _StatementCounter()
+    for engine in {database.engine, database.read_engine}:
+        event.listen(engine, "before_cursor_execute", counter)
+
+    rng = random.Random(session_id)
+    apps: dict[str, AppTest] = {}
+    samples = []
+    pages, weights = zip(*settings["mix"].items())
+
+    def rerun(page: str, action: str, interact) -> None:
+        app = apps.get(page)
+        if app is None:
+            app = apps[page] = AppTest.from_file(str(PAGES[page]), default_timeout=settings["timeout"])
+            action = "load"
+        counter.count = 0
+        wall_start = time.time()
+        started = time.perf_counter()
+        errors = []
+        try:
+            if action != "load":
+                interact(app)
+            app.run()
+            errors = [str(item.value) for item in app.exception] + [
+                str(item.value) for item in app.error
+            ]
+        except Exception as error:
+            errors = [f"{type(error).__name__}: {error}"]
+        samples.append(
+            {
+                "page": page,
+                "action": action,
+                "ms": (time.perf_counter() - started) * 1000,
+                "start": wall_start,
+                "end": time.time(),
+                "statements": counter.count,
+                "errors": [message.splitlines()[0][:160] for message in errors if message],
+            }
+        )
+
+    def submit_joke(app: AppTest) -> None:
+        app.text_area[0].input(f"Load test seed {session_id}-{len(samples)}")
+        app.button[0].click()
+
+    def browse_library(app: AppTest) -> None:
+        next_buttons = [button for button in app.button if button.label == "Next page"]
+        if next_buttons and not next_buttons[0].disabled and rng.random() < 0.5:
+            next_buttons[0].click()
+        else:
+            app.text_input[0].input(rng.choice(_SEARCHES))
+
+    interactions = {
+        "home": ("reload", lambda app: None),
+        "generate": ("submit", submit_joke),
+        "library": ("browse", browse_library),
+    }
+    for _ in range(settings["actions"]):
+        page = rng.choices(pages, weights=weights)[0]
+        action, interact = interactions[page]
+        rerun(page, action, interact)
+        if settings["think_ms"]:
+            time.sleep(rng.expovariate(1000 / settings["think_ms"]))
+    return samples
+
+
+def _percentile(values: list[float], cut: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[cut - 1]
+
+
+def _report(samples: list[dict], elapsed: float, args: argparse.Namespace) -> dict:
+    groups: dict[tuple[str, str], list[dict]] = defaultdict(list)
+    for sample in samples:
+        groups[(sample["page"], sample["action"])].append(sample)
+
+    pages = []
+    for (page, action), items in sorted(groups.items()):
+        latencies = [item["ms"] for item in items]
+        statements = [item["statements"] for item in items]
+        failed = sum(1 for item in items if item["errors"])
+        pages.append(
+            {
+                "page": page,
+                "action": action,
+                "reruns": len(items),
+                "p50_ms": round(_percentile(latencies, 50), 1),
+                "p95_ms": round(_percentile(latencies, 95), 1),
+                "p99_ms": round(_percentile(latencies, 99), 1),
+                "max_ms": round(max(latencies), 1),
+                "statements_mean": round(statistics.fmean(statements), 1),
+                "statements_max": max(statements),
+                "error_rate": round(failed / len(items), 4),
+            }
+        )
+
+    errors = Counter(message for sample in samples for message in sample["errors"])
+    return {
+        "sessions": args.sessions,
+        "actions_per_session": args.actions,
+        "mix": _parse_mix(args.mix),
+        "elapsed_seconds": round(elapsed, 2),
+        "reruns": len(samples),
+        "reruns_per_second": round(len(samples) / elapsed, 2) if elapsed else None,
+        "error_rate": round(sum(1 for sample in samples if sample["errors"]) / len(samples), 4)
+        if samples
+        else 0.0,
+        "pages": pages,
+        "top_errors": errors.most_common(5),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Simulated concurrent Streamlit sessions driving the page scripts through AppTest."
+    )
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent simulated users.")
+    parser.add_argument("--actions", type=int, default=20, help="Page interactions per session.")
+    parser.add_argument(
+        "--mix",
+        nargs="+",
+        default=["generate=1", "library=3", "home=1"],
+        help="Page weights, e.g. generate=1 library=3 home=1.",
+    )
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Mean pause between actions.")
+    parser.add_argument("--rows", type=int, default=10_000, help="Jokes to seed before the run.")
+    parser.add_argument("--database-url", help="Scratch database (default: a temporary SQLite file).")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-rerun timeout in seconds.")
+    parser.add_argument("--output", type=Path, help="Also write the JSON report to this file.")
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        scratch = Path(tempfile.mkdtemp()) / "load.db"
+        os.environ["DATABASE_URL"] = f"sqlite:///{scratch}"
+    os.environ["JOKE_BACKEND"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+    os.environ["FAKE_LLM_JITTER_MS"] = str(args.llm_jitter_ms)
+
+    from app.database import engine, init_db
+    from app.joke_engine import get_template, template_keys
+
+    from benchmarks.suite import grow_to
+
+    init_db()
+    keys = template_keys()
+    grow_to(args.rows, keys, {key: get_template(key).name for key in keys})
+    # Sessions run in fresh processes, which must not inherit pooled connections.
+    engine.dispose()
+
+    settings = {
+        "mix": _parse_mix(args.mix),
+        "actions": args.actions,
+        "think_ms": args.think_ms,
+        "timeout": args.timeout,
+    }
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=args.sessions, mp_context=context) as executor:
+        futures = [
+            executor.submit(_run_session, session_id, settings) for session_id in range(args.sessions)
+        ]
+        samples = [sample for future in futures for sample in future.result()]
+    # Measured from the first rerun to the last, leaving out process start-up.
+    elapsed = max(sample["end"] for sample in samples) - min(sample["start"] for sample in samples)
+
+    report = _report(samples, elapsed, args)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    return 1 if report["error_rate"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import threading
+import time
+from dataclasses import replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.joke_engine import OpenAI, _openai_client, openai_settings
+
+_RESPONSE_BODY = json.dumps(
+    {
+        "id": "resp_benchmark",
+        "object": "response",
+        "created_at": 0,
+        "status": "completed",
+        "model": "benchmark",
+        "output": [
+            {
+                "id": "msg_benchmark",
+                "type": "message",
+                "role": "assistant",
+                "status": "completed",
+                "content": [{"type": "output_text", "text": "A joke.", "annotations": []}],
+            }
+        ],
+        "parallel_tool_calls": False,
+        "tool_choice": "auto",
+        "tools": [],
+    }
+).encode("utf-8")
+
+
+class _ResponsesHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(_RESPONSE_BODY)))
+        self.end_headers()
+        self.wfile.write(_RESPONSE_BODY)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+def _call(client: OpenAI) -> None:
+    client.responses.create(model="benchmark", input="Tell a joke.", max_output_tokens=20)
+
+
+def _measure(label: str, calls: int, make_client) -> dict[str, float | str]:
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        _call(make_client())
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "mode": label,
+        "calls": calls,
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(statistics.quantiles(timings, n=20)[-1], 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Per-call overhead of a new OpenAI client per call vs the pooled client."
+    )
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ResponsesHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}/v1"
+
+    settings = replace(openai_settings(), api_key="benchmark", base_url=base_url, max_retries=0)
+    results = [
+        _measure(
+            "client_per_call",
+            args.calls,
+            lambda: OpenAI(api_key="benchmark", base_url=base_url, max_retries=0),
+        ),
+        _measure("pooled_client", args.calls, lambda: _openai_client(settings)),
+    ]
+    server.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
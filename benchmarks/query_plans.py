@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+from pathlib import Path
+
+# SQLite reports a full scan as "SCAN jokes" without "USING ... INDEX". A rowid scan is
+# fine only when it already yields id order (no temp B-tree sort) and stops at LIMIT.
+_SQLITE_SCAN = re.compile(r"^SCAN (jokes|joke_stats)\b(?!.*USING (COVERING )?INDEX)")
+# FTS5 plans name their strategy as "INDEX <flags>:<constraints>". Flags 0 with "=" is one
+# MATCH per outer row; a plain search must instead walk the matches in rowid order.
+_SQLITE_FTS_PROBE = re.compile(r"VIRTUAL TABLE INDEX 0:=M")
+_SQLITE_FTS_SCAN = re.compile(r"^SCAN jokes_fts VIRTUAL TABLE")
+
+
+def _variants():
+    from app import database
+
+    return {
+        "list_jokes": lambda: database.list_jokes(limit=50),
+        "list_jokes_after_id": lambda: database.list_jokes(limit=50, after_id=100),
+        "list_jokes_one_template": lambda: database.list_jokes(template_keys=["ironie"]),
+        "list_jokes_two_templates": lambda: database.list_jokes(
+            template_keys=["ironie", "antihumor"], after_id=100
+        ),
+        "list_jokes_search": lambda: database.list_jokes(search_text="printer"),
+        "list_jokes_search_after_id": lambda: database.list_jokes(search_text="printer", after_id=100),
+        "list_jokes_search_template": lambda: database.list_jokes(
+            search_text="print", template_keys=["ironie"]
+        ),
+        "list_jokes_search_ranked": lambda: database.list_jokes(
+            search_text="printer", rank_by_relevance=True
+        ),
+        "get_stats": database._read_stats,
+        "stats_seed_latest": lambda: database._session().scalar(
+            database.select(database.func.max(database.Joke.created_at))
+        ),
+    }
+
+
+def _capture(engine, call) -> list[tuple[str, object]]:
+    from sqlalchemy import event
+
+    captured: list[tuple[str, object]] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        call()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return captured
+
+
+def _sqlite_problems(
+    connection, statement: str, parameters, ranked: bool
+) -> tuple[list[str], list[str]]:
+    plan = [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+    sorts = any("USE TEMP B-TREE" in line for line in plan)
+    problems = [line for line in plan if _SQLITE_SCAN.match(line) and (sorts or "LIMIT" not in statement)]
+    problems += [line for line in plan if _SQLITE_FTS_PROBE.search(line)]
+    # Relevance order has to sort every match; id order must not.
+    if sorts and not ranked:
+        problems += [line for line in plan if _SQLITE_FTS_SCAN.match(line)]
+    return plan, problems
+
+
+def _postgres_problems(
+    connection, statement: str, parameters, ranked: bool
+) -> tuple[list[str], list[str]]:
+    # Tiny tables always favour sequential scans; disabling them asks whether an index *can* serve.
+    connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    rows = connection.exec_driver_sql(f"EXPLAIN {statement}", parameters).all()
+    plan = [row[0] for row in rows]
+    problems = [line for line in plan if "Seq Scan on jokes" in line or "Seq Scan on joke_stats" in line]
+    return plan, problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Check that every list_jokes/get_stats query shape is served by an index."
+    )
+    parser.add_argument(
+        "--database-url",
+        help="Database to check (default: a temporary SQLite file with seeded rows).",
+    )
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        scratch = Path(tempfile.mkdtemp()) / "plans.db"
+        os.environ["DATABASE_URL"] = f"sqlite:///{scratch}"
+
+    from app.database import IS_SQLITE, NewJoke, engine, init_db, save_jokes
+
+    init_db()
+    if not args.database_url:
+        save_jokes(
+            [
+                NewJoke(
+                    template_key=("ironie", "antihumor", "zelfspot")[index % 3],
+                    template_name="Benchmark",
+                    user_input=f"My printer broke {index}",
+                    add_on="",
+                    generated_joke=f"Joke {index}",
+                )
+                for index in range(500)
+            ]
+        )
+
+    explain = _sqlite_problems if IS_SQLITE else _postgres_problems
+    report = {}
+    failed = False
+    for name, call in _variants().items():
+        for statement, parameters in _capture(engine, call):
+            with engine.connect() as connection:
+                plan, problems = explain(
+                    connection, statement, parameters, name.endswith("_ranked")
+                )
+                connection.rollback()
+            report.setdefault(name, []).append({"plan": plan, "problems": problems})
+            failed = failed or bool(problems)
+
+    print(json.dumps(report, indent=2))
+    print(
+        "FAIL: some queries scan or sort more rows than they return"
+        if failed
+        else "OK: every query uses an index",
+        file=sys.stderr,
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
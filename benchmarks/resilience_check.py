@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Callable, Iterator
+
+from openai import APIConnectionError, APIStatusError, APITimeoutError, RateLimitError
+
+from app.backends import RateLimitedError, TransientBackendError
+from app.hedging import DeadlineExceededError, Hedger, HedgePolicy
+from app.joke_engine import _backend_error
+from app.resilience import CircuitBreaker, ResilientCaller, RetryPolicy
+
+_RESET_SECONDS = 0.05
+
+
+def _open_caller() -> ResilientCaller:
+    caller = ResilientCaller(
+        retry=RetryPolicy(max_attempts=1),
+        breaker=CircuitBreaker(failure_threshold=1, reset_seconds=_RESET_SECONDS),
+    )
+
+    def fail() -> None:
+        raise TransientBackendError("Simulated 503.")
+
+    try:
+        caller.call(fail)
+    except TransientBackendError:
+        pass
+    assert caller.breaker.state == "open", caller.breaker.state
+    time.sleep(_RESET_SECONDS * 2)
+    return caller
+
+
+def _slow_stream(seconds: float) -> Iterator[str]:
+    time.sleep(seconds)
+    yield "late "
+    yield "answer"
+
+
+def _recovers(caller: ResilientCaller) -> None:
+    assert caller.call(lambda: "ok") == "ok"
+    assert caller.breaker.state == "closed", caller.breaker.state
+
+
+def check_probe_stream_closed_early() -> None:
+    caller = _open_caller()
+    stream = caller.stream(lambda: _slow_stream(0))
+    next(stream)
+    stream.close()
+    _recovers(caller)
+
+
+def check_probe_stream_past_deadline() -> None:
+    caller = _open_caller()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        hedger = Hedger("check", HedgePolicy(deadline_seconds=0.1), executor)
+        items = hedger.stream(
+            lambda path, cancelled, deadline: caller.stream(
+                lambda: _slow_stream(0.3), deadline=deadline, cancelled=cancelled
+            )
+        )
+        try:
+            list(items)
+        except DeadlineExceededError:
+            pass
+        else:
+            raise AssertionError("the slow probe should have missed its deadline")
+    # Leaving the executor waits for the pump thread to close the abandoned stream.
+    _recovers(caller)
+
+
+def check_long_retry_after_fails_fast() -> None:
+    caller = ResilientCaller(retry=RetryPolicy(max_attempts=4, max_delay_seconds=1))
+
+    def busy() -> None:
+        raise RateLimitedError("Simulated 429.", retry_after_seconds=60)
+
+    started = time.perf_counter()
+    try:
+        caller.call(busy)
+    except RateLimitedError:
+        pass
+    assert time.perf_counter() - started < 1, "a Retry-After over the cap should not be waited out"
+    assert caller.stats().retries == 0
+
+
+def check_hedge_delay_follows_recent_latencies() -> None:
+    policy = HedgePolicy(
+        hedge_percentile=0.95, min_hedge_delay_seconds=0.01, min_samples=5, latency_window_seconds=0.2
+    )
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        hedger = Hedger("check", policy, executor)
+        for seconds in (0.3, 0.02):
+            for _ in range(policy.min_samples):
+                hedger.call(lambda path, cancelled, deadline: time.sleep(seconds))
+            time.sleep(policy.latency_window_seconds)
+        delay = hedger.hedge_delay()
+    assert delay is not None and delay < 0.1, f"hedge delay {delay} still reflects old latencies"
+
+
+def _openai_response(status: int, headers: dict[str, str] | None = None) -> SimpleNamespace:
+    # Just the parts of an HTTP response that the OpenAI errors and _backend_error read.
+    request = SimpleNamespace(method="POST", url="https://api.openai.com/v1/responses")
+    return SimpleNamespace(status_code=status, headers=headers or {}, request=request)
+
+
+def check_openai_errors_are_classified() -> None:
+    limited = _backend_error(
+        RateLimitError("busy", response=_openai_response(429, {"retry-after": "7"}), body=None)
+    )
+    assert type(limited) is RateLimitedError, type(limited)
+    assert limited.retry_after_seconds == 7, limited.retry_after_seconds
+
+    limited_ms = _backend_error(
+        RateLimitError("busy", response=_openai_response(429, {"retry-after-ms": "250"}), body=None)
+    )
+    assert limited_ms.retry_after_seconds == 0.25, limited_ms.retry_after_seconds
+
+    unavailable = _backend_error(
+        APIStatusError("down", response=_openai_response(503, {"retry-after": "2"}), body=None)
+    )
+    assert type(unavailable) is TransientBackendError, type(unavailable)
+    assert unavailable.retry_after_seconds == 2, unavailable.retry_after_seconds
+
+    request = _openai_response(200).request
+    for error in (APIConnectionError(request=request), APITimeoutError(request=request)):
+        classified = _backend_error(error)
+        assert type(classified) is TransientBackendError, (error, type(classified))
+        assert classified.retry_after_seconds is None
+
+    # Client errors will fail the same way again, so they must not be retried.
+    rejected = _backend_error(
+        APIStatusError("bad request", response=_openai_response(400), body=None)
+    )
+    assert not isinstance(rejected, TransientBackendError), type(rejected)
+    assert isinstance(rejected, RuntimeError), type(rejected)
+
+
+CHECKS: list[Callable[[], None]] = [
+    check_probe_stream_closed_early,
+    check_probe_stream_past_deadline,
+    check_long_retry_after_fails_fast,
+    check_hedge_delay_follows_recent_latencies,
+    check_openai_errors_are_classified,
+]
+
+
+def main() -> int:
+    failed = 0
+    for check in CHECKS:
+        try:
+            check()
+        except Exception as error:
+            failed += 1
+            print(f"FAIL {check.__name__}: {error}", file=sys.stderr)
+        else:
+            print(f"ok   {check.__name__}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
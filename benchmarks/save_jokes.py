@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+
+def _records(count: int):
+    from app.database import NewJoke
+
+    return [
+        NewJoke(
+            template_key="ironie",
+            template_name="Ironie (Irony)",
+            user_input=f"Benchmark input {index}",
+            add_on="",
+            generated_joke=f"Benchmark joke {index}",
+        )
+        for index in range(count)
+    ]
+
+
+def _legacy_save(records) -> None:
+    # The pre-save_jokes path: one session, commit and refresh per row.
+    from app.database import Joke, _session
+
+    for record in records:
+        session = _session()
+        try:
+            joke = Joke(
+                template_key=record.template_key,
+                template_name=record.template_name,
+                user_input=record.user_input,
+                add_on=record.add_on,
+                generated_joke=record.generated_joke,
+            )
+            session.add(joke)
+            session.commit()
+            session.refresh(joke)
+        finally:
+            session.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Insert throughput of save_jokes vs per-row commits.")
+    parser.add_argument(
+        "--database-url",
+        help="Scratch database to write into (default: a temporary SQLite file).",
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10_000])
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        scratch = Path(tempfile.mkdtemp()) / "bench.db"
+        os.environ["DATABASE_URL"] = f"sqlite:///{scratch}"
+
+    from app.database import get_storage_label, init_db, save_jokes
+
+    init_db()
+    results = []
+    for size in args.sizes:
+        records = _records(size)
+        for mode, run in (("per_row_commit", _legacy_save), ("save_jokes", save_jokes)):
+            start = time.perf_counter()
+            run(records)
+            elapsed = time.perf_counter() - start
+            results.append(
+                {
+                    "storage": get_storage_label(),
+                    "rows": size,
+                    "mode": mode,
+                    "seconds": round(elapsed, 4),
+                    "rows_per_second": round(size / elapsed, 1) if elapsed else None,
+                }
+            )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Many threads doing mixed save_joke/list_jokes against one SQLite file."
+    )
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--operations", type=int, default=200, help="Operations per thread.")
+    parser.add_argument("--write-ratio", type=float, default=0.3)
+    parser.add_argument("--database-url", help="SQLite URL (default: a temporary file).")
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        scratch = Path(tempfile.mkdtemp()) / "stress.db"
+        os.environ["DATABASE_URL"] = f"sqlite:///{scratch}"
+
+    from app.database import IS_SQLITE, init_db, list_jokes, save_joke
+
+    if not IS_SQLITE:
+        print("This stress test targets the SQLite profile.", file=sys.stderr)
+        return 2
+
+    init_db()
+    errors: Counter[str] = Counter()
+    timings: dict[str, list[float]] = {"save_joke": [], "list_jokes": []}
+    lock = threading.Lock()
+    start_gate = threading.Barrier(args.threads)
+
+    def worker(worker_id: int) -> None:
+        rng = random.Random(worker_id)
+        start_gate.wait()
+        for index in range(args.operations):
+            write = rng.random() < args.write_ratio
+            name = "save_joke" if write else "list_jokes"
+            started = time.perf_counter()
+            try:
+                if write:
+                    save_joke(
+                        template_key="ironie",
+                        template_name="Ironie (Irony)",
+                        user_input=f"stress {worker_id}-{index}",
+                        add_on="",
+                        generated_joke="A stress-tested joke.",
+                    )
+                else:
+                    list_jokes(
+                        search_text=rng.choice(["", "stress", "joke"]),
+                        template_keys=rng.choice([None, ["ironie"]]),
+                        limit=50,
+                    )
+            except RuntimeError as error:
+                with lock:
+                    errors[f"{name}: {error.__cause__ or error}"] += 1
+                continue
+            with lock:
+                timings[name].append((time.perf_counter() - started) * 1000)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    report = {
+        "threads": args.threads,
+        "operations": args.threads * args.operations,
+        "elapsed_seconds": round(elapsed, 3),
+        "operations_per_second": round(args.threads * args.operations / elapsed, 1),
+        "errors": dict(errors),
+    }
+    for name, values in timings.items():
+        if len(values) >= 2:
+            cuts = statistics.quantiles(values, n=100)
+            report[name] = {
+                "count": len(values),
+                "p50_ms": round(cuts[49], 3),
+                "p95_ms": round(cuts[94], 3),
+                "p99_ms": round(cuts[98], 3),
+            }
+    print(json.dumps(report, indent=2))
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+_WORDS = (
+    "printer", "coffee", "monday", "meeting", "cat", "dog", "traffic", "weather", "diet",
+    "gym", "password", "wifi", "neighbor", "landlord", "taxes", "laundry", "airport",
+    "dentist", "pizza", "spreadsheet", "deadline", "email", "zoom", "parking", "alarm",
+    "keyboard", "vacation", "budget", "recipe", "garden", "bicycle", "elevator", "train",
+)
+# Appears in about one row in a thousand, for a selective search.
+_RARE_WORD = "zeppelin"
+_SEED_BATCH = 5000
+
+
+def _seed_rows(start: int, stop: int, template_keys: list[str], template_names: dict[str, str]):
+    from app.database import NewJoke
+
+    rng = random.Random(start)
+    for index in range(start, stop):
+        words = rng.sample(_WORDS, 4)
+        if rng.random() < 0.001:
+            words.append(_RARE_WORD)
+        template_key = template_keys[index % len(template_keys)]
+        yield NewJoke(
+            template_key=template_key,
+            template_name=template_names[template_key],
+            user_input=" ".join(words[:2]),
+            add_on=words[2],
+            generated_joke=f"Seeded joke {index} about {' and '.join(words[3:])}.",
+        )
+
+
+def grow_to(rows: int, template_keys: list[str], template_names: dict[str, str]) -> float:
+    from app.database import get_stats, save_jokes
+
+    current, _ = get_stats()
+    started = time.perf_counter()
+    while current < rows:
+        stop = min(rows, current + _SEED_BATCH)
+        save_jokes(list(_seed_rows(current, stop, template_keys, template_names)))
+        current = stop
+    return time.perf_counter() - started
+
+
+def _measure(name: str, rows: int, iterations: int, operation: Callable[[int], None]) -> dict:
+    timings = []
+    for index in range(iterations):
+        started = time.perf_counter()
+        operation(index)
+        timings.append((time.perf_counter() - started) * 1000)
+    return _summary(name, rows, timings)
+
+
+def _summary(name: str, rows: int, timings: list[float]) -> dict:
+    cuts = statistics.quantiles(timings, n=100, method="inclusive") if len(timings) >= 2 else timings * 99
+    total_seconds = sum(timings) / 1000
+    return {
+        "rows": rows,
+        "operation": name,
+        "iterations": len(timings),
+        "throughput_per_second": round(len(timings) / total_seconds, 1) if total_seconds else None,
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "p50_ms": round(cuts[49], 3),
+        "p95_ms": round(cuts[94], 3),
+        "p99_ms": round(cuts[98], 3),
+        "max_ms": round(max(timings), 3),
+    }
+
+
+def _run_size(rows: int, iterations: int, template_keys: list[str]) -> list[dict]:
+    from app import database
+    from app.database import get_stats, list_jokes, save_joke
+    from app.joke_engine import generate_joke, stream_joke
+
+    first_template = template_keys[0]
+    results = [
+        _measure(
+            "generate_joke",
+            rows,
+            iterations,
+            lambda index: generate_joke(first_template, f"benchmark seed {rows}-{index}", ""),
+        )
+    ]
+
+    first_tokens = []
+
+    def stream(index: int) -> None:
+        joke_stream = stream_joke(first_template, f"streamed seed {rows}-{index}", "")
+        for _ in joke_stream:
+            pass
+        first_tokens.append(joke_stream.first_token_seconds * 1000)
+
+    results.append(_measure("stream_joke", rows, iterations, stream))
+    results.append(_summary("stream_joke[first_token]", rows, first_tokens))
+
+    results.append(
+        _measure(
+            "save_joke",
+            rows,
+            iterations,
+            lambda index: save_joke(
+                template_key=first_template,
+                template_name=first_template,
+                user_input=f"benchmark save {rows}-{index}",
+                add_on="",
+                generated_joke="A benchmarked joke.",
+            ),
+        )
+    )
+
+    list_variants = {
+        "list_jokes": {},
+        "list_jokes[template]": {"template_keys": [first_template]},
+        "list_jokes[search]": {"search_text": "printer"},
+        "list_jokes[search_rare]": {"search_text": _RARE_WORD},
+        "list_jokes[search+template]": {"search_text": "printer", "template_keys": [first_template]},
+    }
+    for name, filters in list_variants.items():
+        results.append(_measure(name, rows, iterations, lambda index: list_jokes(limit=50, **filters)))
+
+    results.append(_measure("get_stats", rows, iterations, lambda index: get_stats()))
+
+    def uncached_stats(index: int) -> None:
+        database._stats_cache = None
+        get_stats()
+
+    results.append(_measure("get_stats[uncached]", rows, iterations, uncached_stats))
+    return results
+
+
+def _regressions(results: list[dict], baseline_path: Path, tolerance: float) -> list[str]:
+    baseline = {
+        (item["rows"], item["operation"]): item
+        for item in json.loads(baseline_path.read_text(encoding="utf-8"))["results"]
+    }
+    found = []
+    for item in results:
+        previous = baseline.get((item["rows"], item["operation"]))
+        if previous and item["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            found.append(
+                f"{item['operation']} at {item['rows']} rows: p95 {previous['p95_ms']}ms -> {item['p95_ms']}ms"
+            )
+    return found
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="End-to-end latency and throughput of the app entry points on the fake LLM backend."
+    )
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--iterations", type=int, default=50, help="Calls per operation and size.")
+    parser.add_argument("--database-url", help="Scratch database to seed (default: a temporary SQLite file).")
+    parser.add_argument("--llm-latency-ms", type=float, default=20.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=5.0)
+    parser.add_argument("--llm-distribution", default="lognormal")
+    parser.add_argument("--output", type=Path, help="Also write the JSON report to this file.")
+    parser.add_argument("--baseline", type=Path, help="Earlier report to compare p95 latencies against.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed p95 slowdown against the baseline (0.25 = 25%%).",
+    )
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        scratch = Path(tempfile.mkdtemp()) / "suite.db"
+        os.environ["DATABASE_URL"] = f"sqlite:///{scratch}"
+    os.environ["JOKE_BACKEND"] = "fake"
+    os.environ["JOKE_CACHE_POLICY"] = "fresh"
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+    os.environ["FAKE_LLM_JITTER_MS"] = str(args.llm_jitter_ms)
+    os.environ["FAKE_LLM_DISTRIBUTION"] = args.llm_distribution
+
+    from app.database import get_storage_label, init_db
+    from app.joke_engine import get_template, template_keys
+
+    init_db()
+    keys = template_keys()
+    names = {key: get_template(key).name for key in keys}
+
+    results = []
+    seeding = {}
+    for rows in sorted(args.rows):
+        seeding[rows] = round(grow_to(rows, keys, names), 3)
+        print(f"seeded {rows} rows, measuring...", file=sys.stderr)
+        results.extend(_run_size(rows, args.iterations, keys))
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "storage": get_storage_label(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "llm": {
+            "latency_ms": args.llm_latency_ms,
+            "jitter_ms": args.llm_jitter_ms,
+            "distribution": args.llm_distribution,
+        },
+        "seed_seconds": seeding,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+
+    if args.baseline:
+        regressions = _regressions(results, args.baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
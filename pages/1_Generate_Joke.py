@@ -1,11 +1,16 @@
+import time
+
 import streamlit as st
 
-from app.database import init_db, save_joke
+from app.database import NewJoke, init_db, save_joke, save_jokes
 from app.joke_engine import (
     echo_input,
     extend_input,
-    generate_joke,
+    generate_joke_result,
+    generate_jokes_concurrently,
     get_template,
+    should_save,
+    stream_joke,
     template_keys,
 )
 from app.ui import render_sidebar
@@ -20,7 +25,10 @@ except RuntimeError as error:
 render_sidebar("Generate Joke")
 
 st.title("Generate Joke")
-st.write("Enter text, choose a humor template, and save the generated joke.")
+st.write(
+    "Enter text, choose one or more humor templates, and save the generated jokes. "
+    "Pick several templates to compare styles side by side."
+)
 
 all_template_keys = template_keys()
 
@@ -34,41 +42,142 @@ with st.form("generate_joke_form"):
         "Optional add-on",
         placeholder="Example: right before lunch on Friday",
     )
-    selected_template_key = st.selectbox(
-        "Humor template",
+    selected_template_keys = st.multiselect(
+        "Humor templates",
         options=all_template_keys,
+        default=all_template_keys[:1],
         format_func=lambda key: get_template(key).name,
     )
-    st.caption(get_template(selected_template_key).description)
+    for key in selected_template_keys:
+        st.caption(f"{get_template(key).name}: {get_template(key).description}")
+    stream_output = st.checkbox(
+        "Stream the joke as it is written (single template only)", value=True
+    )
     submitted = st.form_submit_button("Generate and save")
 
+
+def generate_for_templates(keys: list[str]) -> None:
+    started = time.perf_counter()
+    slots = {key: st.empty() for key in keys}
+    for key in keys:
+        slots[key].info(f"Writing a {get_template(key).name} joke...")
+
+    results = {}
+    for key, outcome in generate_jokes_concurrently(keys, user_input, add_on):
+        with slots[key].container():
+            st.markdown(f"**{get_template(key).name}**")
+            if isinstance(outcome, RuntimeError):
+                st.error(str(outcome))
+            else:
+                results[key] = outcome
+                st.write(outcome.text)
+                cached_label = " (cached)" if outcome.cache_hit else ""
+                if outcome.coalesced:
+                    cached_label += " (shared with an identical request)"
+                if outcome.hedged:
+                    cached_label += f" (hedged to {outcome.model})"
+                st.caption(f"Ready after {time.perf_counter() - started:.2f}s{cached_label}")
+
+    saved_keys = [key for key in keys if key in results and should_save(results[key])]
+    try:
+        joke_ids = save_jokes(
+            [
+                NewJoke(
+                    template_key=key,
+                    template_name=get_template(key).name,
+                    user_input=user_input,
+                    add_on=add_on,
+                    generated_joke=results[key].text,
+                    model=results[key].model,
+                    input_tokens=results[key].input_tokens,
+                    output_tokens=results[key].output_tokens,
+                    latency_ms=results[key].latency_ms,
+                    cache_hit=results[key].cache_hit,
+                    coalesced=results[key].coalesced,
+                )
+                for key in saved_keys
+            ]
+        )
+    except RuntimeError as error:
+        st.error(str(error))
+        st.stop()
+
+    if joke_ids:
+        saved_labels = ", ".join(f"#{joke_id}" for joke_id in joke_ids)
+        st.success(f"Saved {len(joke_ids)} joke(s): {saved_labels}")
+    st.caption(f"All templates finished after {time.perf_counter() - started:.2f}s.")
+
+
 if submitted:
     if not user_input.strip():
         st.error("Add some input text first.")
+    elif not selected_template_keys:
+        st.error("Pick at least one humor template.")
+    elif len(selected_template_keys) > 1:
+        generate_for_templates(selected_template_keys)
     else:
-        try:
-            generated = generate_joke(selected_template_key, user_input, add_on)
-        except RuntimeError as error:
-            st.error(str(error))
-            st.stop()
+        selected_template_key = selected_template_keys[0]
+        started = time.perf_counter()
+        if stream_output:
+            st.markdown("**Generated joke**")
+            stream = stream_joke(selected_template_key, user_input, add_on)
+            try:
+                st.write_stream(stream)
+            except RuntimeError as error:
+                st.error(str(error))
+                st.stop()
+            result = stream.result()
+            timing = (
+                f"First token after {stream.first_token_seconds:.2f}s, "
+                f"complete after {stream.total_seconds:.2f}s."
+            )
+        else:
+            try:
+                with st.spinner("Writing joke..."):
+                    result = generate_joke_result(selected_template_key, user_input, add_on)
+            except RuntimeError as error:
+                st.error(str(error))
+                st.stop()
+            timing = f"Complete after {time.perf_counter() - started:.2f}s."
 
         template_name = get_template(selected_template_key).name
-        try:
-            joke_id = save_joke(
-                template_key=selected_template_key,
-                template_name=template_name,
-                user_input=user_input,
-                add_on=add_on,
-                generated_joke=generated,
-            )
-        except RuntimeError as error:
-            st.error(str(error))
-            st.stop()
+        if should_save(result):
+            try:
+                joke_id = save_joke(
+                    template_key=selected_template_key,
+                    template_name=template_name,
+                    user_input=user_input,
+                    add_on=add_on,
+                    generated_joke=result.text,
+                    model=result.model,
+                    input_tokens=result.input_tokens,
+                    output_tokens=result.output_tokens,
+                    latency_ms=result.latency_ms,
+                    cache_hit=result.cache_hit,
+                    coalesced=result.coalesced,
+                )
+            except RuntimeError as error:
+                st.error(str(error))
+                st.stop()
+            st.success(f"Saved joke #{joke_id}")
+        else:
+            st.info("An identical request was already running; its joke is saved once, not again.")
 
-        st.success(f"Saved joke #{joke_id}")
+        st.caption(timing)
+        if result.coalesced:
+            st.caption("Shared the answer of an identical request that was already in flight.")
+        elif result.hedged:
+            st.caption(f"The first request was slow; a hedged request to {result.model} answered first.")
+        elif result.cache_hit:
+            st.caption(f"Reused a cached {result.model} generation for this template and input.")
+        elif result.output_tokens is not None:
+            st.caption(
+                f"{result.model}: {result.input_tokens} input and {result.output_tokens} output tokens."
+            )
         st.markdown("**Echoed input**")
         st.write(echo_input(user_input))
         st.markdown("**Input plus add-on**")
         st.write(extend_input(user_input, add_on))
-        st.markdown("**Generated joke**")
-        st.text_area("Generated output", value=generated, height=180)
+        if not stream_output:
+            st.markdown("**Generated joke**")
+            st.text_area("Generated output", value=result.text, height=180)
@@ -1,47 +1,105 @@
-import csv
-import io
+import math
 from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
 
 import streamlit as st
+from streamlit.runtime.media_file_manager import MediaFileManager
 
-from app.database import JokeRecord, init_db, list_jokes
+from app.database import JokeRecord, get_jokes, init_db, list_joke_previews, query_cache_stats
+from app.export import (
+    EXPORT_FORMATS,
+    available_formats,
+    export_jokes,
+    new_export_path,
+    remove_stale_exports,
+)
 from app.joke_engine import get_template, template_keys
 from app.ui import render_sidebar
 
 
+DETAIL_PAGE_SIZE = 20
+EXPORT_MAX_AGE_SECONDS = 3600
+# Newer Streamlit reads download data only when the button is clicked; older versions
+# copy it into memory on every render.
+DEFERRED_DOWNLOADS = hasattr(MediaFileManager, "add_deferred")
+
+
 def shorten(value: str, max_length: int = 90) -> str:
     if len(value) <= max_length:
         return value
     return value[: max_length - 3] + "..."
 
 
-def records_to_csv(records: list[JokeRecord]) -> str:
-    buffer = io.StringIO()
-    writer = csv.writer(buffer)
-    writer.writerow(
-        [
-            "id",
-            "created_at",
-            "template_key",
-            "template_name",
-            "user_input",
-            "add_on",
-            "generated_joke",
-        ]
-    )
-    for record in records:
-        writer.writerow(
-            [
-                record.id,
-                record.created_at,
-                record.template_key,
-                record.template_name,
-                record.user_input,
-                record.add_on,
-                record.generated_joke,
-            ]
+def discard_export() -> None:
+    previous = st.session_state.pop("library_export", None)
+    if previous:
+        Path(previous["path"]).unlink(missing_ok=True)
+
+
+def forget_export() -> None:
+    # The download reads and removes the file itself.
+    st.session_state.pop("library_export", None)
+
+
+def read_once(path: Path) -> Callable[[], bytes]:
+    def read() -> bytes:
+        data = path.read_bytes()
+        path.unlink(missing_ok=True)
+        return data
+
+    return read
+
+
+def prepare_export(
+    export_format: str,
+    search_text: str,
+    template_keys: list[str] | None,
+) -> None:
+    discard_export()
+    remove_stale_exports(EXPORT_MAX_AGE_SECONDS)
+
+    _, suffix = EXPORT_FORMATS[export_format]
+    path = new_export_path(suffix)
+    try:
+        row_count = export_jokes(
+            path,
+            export_format,
+            search_text=search_text,
+            template_keys=template_keys,
         )
-    return buffer.getvalue()
+    except RuntimeError:
+        path.unlink(missing_ok=True)
+        raise
+
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    st.session_state["library_export"] = {
+        "path": str(path),
+        "format": export_format,
+        "file_name": f"jokes-{timestamp}{suffix}",
+        "row_count": row_count,
+    }
+
+
+def previous_page() -> None:
+    st.session_state["library_cursors"].pop()
+
+
+def next_page(cursor: int) -> None:
+    st.session_state["library_cursors"].append(cursor)
+
+
+def render_record(record: JokeRecord, snippet: str) -> None:
+    if snippet:
+        st.markdown("**Match**")
+        st.markdown(snippet)
+    st.markdown("**Input**")
+    st.write(record.user_input)
+    if record.add_on:
+        st.markdown("**Add-on**")
+        st.write(record.add_on)
+    st.markdown("**Generated joke**")
+    st.write(record.generated_joke)
 
 
 st.set_page_config(page_title="Joke Library", layout="wide")
@@ -62,7 +120,7 @@ search_col, limit_col = st.columns([3, 1])
 with search_col:
     search_text = st.text_input(
         "Search text",
-        placeholder="Search input, add-on, joke text, or template name",
+        placeholder="Search input, add-on, joke text, or template name (prefix words match)",
     )
 with limit_col:
     limit = st.slider("Max rows", min_value=10, max_value=200, value=50, step=10)
@@ -72,50 +130,149 @@ selected_template_keys = st.multiselect(
     options=all_template_keys,
     format_func=lambda key: get_template(key).name,
 )
+rank_by_relevance = st.checkbox(
+    "Sort search results by relevance",
+    value=False,
+    disabled=not search_text.strip(),
+)
+
+filter_signature = (search_text.strip(), tuple(selected_template_keys), limit, rank_by_relevance)
+if st.session_state.get("library_filters") != filter_signature:
+    st.session_state["library_filters"] = filter_signature
+    st.session_state["library_cursors"] = [None]
+    discard_export()
+cursors = st.session_state["library_cursors"]
 
 try:
-    records = list_jokes(
+    page = list_joke_previews(
         search_text=search_text,
         template_keys=selected_template_keys or None,
         limit=limit,
+        after_id=cursors[-1],
+        rank_by_relevance=rank_by_relevance,
     )
 except RuntimeError as error:
     st.error(str(error))
     st.stop()
 
-st.write(f"Found {len(records)} joke(s).")
+previews = page.previews
+st.write(f"Page {len(cursors)}: showing {len(previews)} joke(s).")
+cache_stats = query_cache_stats()
+st.caption(
+    f"Query cache: {cache_stats.hit_rate:.0%} hit rate "
+    f"({cache_stats.hits} hits, {cache_stats.misses} misses, {cache_stats.size}/{cache_stats.maxsize} entries)"
+)
 
-if records:
-    csv_data = records_to_csv(records)
-    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
-    st.download_button(
-        "Export filtered results to CSV",
-        data=csv_data,
-        file_name=f"jokes-{timestamp}.csv",
-        mime="text/csv",
-    )
+if previews:
+    with st.expander("Export all matching jokes", expanded=False):
+        format_col, prepare_col = st.columns([2, 1])
+        with format_col:
+            export_format = st.selectbox("Format", options=available_formats())
+        with prepare_col:
+            prepare = st.button("Prepare export")
+        if prepare:
+            try:
+                with st.spinner("Writing export..."):
+                    prepare_export(export_format, search_text, selected_template_keys or None)
+            except RuntimeError as error:
+                st.error(str(error))
+
+        export = st.session_state.get("library_export")
+        if export and Path(export["path"]).exists():
+            mime, _ = EXPORT_FORMATS[export["format"]]
+            label = f"Download {export['row_count']} joke(s) as {export['format'].upper()}"
+            if DEFERRED_DOWNLOADS:
+                st.download_button(
+                    label,
+                    data=read_once(Path(export["path"])),
+                    file_name=export["file_name"],
+                    mime=mime,
+                    on_click=forget_export,
+                )
+            else:
+                # Render the button once: its data stays in memory only until the next rerun.
+                with open(export["path"], "rb") as export_file:
+                    st.download_button(
+                        label,
+                        data=export_file,
+                        file_name=export["file_name"],
+                        mime=mime,
+                    )
+                discard_export()
+                st.caption("Download now: the export is discarded on your next interaction.")
 
     preview_rows = [
         {
-            "ID": record.id,
-            "Saved at (UTC)": record.created_at,
-            "Template": record.template_name,
-            "Input": shorten(record.user_input),
-            "Joke preview": shorten(record.generated_joke),
+            "ID": preview.id,
+            "Saved at (UTC)": preview.created_at,
+            "Template": preview.template_name,
+            "Input": shorten(preview.input_preview),
+            "Joke preview": shorten(preview.joke_preview),
         }
-        for record in records
+        for preview in previews
     ]
-    st.dataframe(preview_rows, use_container_width=True, hide_index=True)
+    if search_text.strip():
+        for row, preview in zip(preview_rows, previews):
+            row["Match"] = shorten(preview.snippet.replace("**", ""))
+    table = st.dataframe(
+        preview_rows,
+        use_container_width=True,
+        hide_index=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key="library_table",
+    )
+
+    previous_col, next_col = st.columns(2)
+    with previous_col:
+        st.button("Previous page", on_click=previous_page, disabled=len(cursors) == 1)
+    with next_col:
+        st.button(
+            "Next page",
+            on_click=next_page,
+            args=(page.next_cursor,),
+            disabled=page.next_cursor is None,
+        )
 
     st.subheader("Full records")
-    for record in records:
-        with st.expander(f"#{record.id} | {record.template_name} | {record.created_at}"):
-            st.markdown("**Input**")
-            st.write(record.user_input)
-            if record.add_on:
-                st.markdown("**Add-on**")
-                st.write(record.add_on)
-            st.markdown("**Generated joke**")
-            st.write(record.generated_joke)
+    expand_page = st.toggle(f"Expand a page of {DETAIL_PAGE_SIZE}", value=False)
+    if expand_page:
+        chunk_count = math.ceil(len(previews) / DETAIL_PAGE_SIZE)
+        chunk = st.selectbox(
+            "Records",
+            options=range(chunk_count),
+            format_func=lambda index: (
+                f"{index * DETAIL_PAGE_SIZE + 1}-"
+                f"{min((index + 1) * DETAIL_PAGE_SIZE, len(previews))} of {len(previews)}"
+            ),
+        )
+        detail_ids = [
+            preview.id
+            for preview in previews[chunk * DETAIL_PAGE_SIZE : (chunk + 1) * DETAIL_PAGE_SIZE]
+        ]
+    else:
+        selected_rows = [row for row in table.selection.rows if row < len(previews)]
+        detail_ids = [previews[selected_rows[0]].id] if selected_rows else []
+        if not detail_ids:
+            st.caption("Select a row in the table to see its full record.")
+
+    try:
+        detail_records = get_jokes(detail_ids)
+    except RuntimeError as error:
+        st.error(str(error))
+        detail_records = []
+
+    snippets = {preview.id: preview.snippet for preview in previews}
+    if expand_page:
+        for record in detail_records:
+            with st.expander(f"#{record.id} | {record.template_name} | {record.created_at}"):
+                render_record(record, snippets.get(record.id, ""))
+    else:
+        for record in detail_records:
+            st.markdown(f"#### #{record.id} | {record.template_name} | {record.created_at}")
+            render_record(record, snippets.get(record.id, ""))
+elif len(cursors) > 1:
+    st.info("No more jokes on this page.")
+    st.button("Previous page", on_click=previous_page)
 else:
     st.info("No jokes found yet. Generate one on the `Generate Joke` page.")
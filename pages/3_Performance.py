@@ -0,0 +1,161 @@
+import streamlit as st
+
+from app.database import (
+    GenerationUsage,
+    database_pool_metrics,
+    generation_usage_by_day,
+    generation_usage_by_template,
+    init_db,
+    query_cache_stats,
+    read_pool_metrics,
+)
+from app.joke_engine import coalescing_stats, generation_cache, hedging_stats, llm_call_stats
+from app.metrics import metrics
+from app.ui import render_sidebar
+
+
+def to_ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+def usage_rows(usage: list[GenerationUsage], group_label: str) -> list[dict[str, object]]:
+    return [
+        {
+            group_label: row.group,
+            "Jokes": row.jokes,
+            "Cache hits": row.cache_hits,
+            "Mean latency (ms)": None if row.mean_latency_ms is None else round(row.mean_latency_ms),
+            "Max latency (ms)": row.max_latency_ms,
+            "Input tokens": row.input_tokens,
+            "Output tokens": row.output_tokens,
+            "Mean output tokens": (
+                None if row.mean_output_tokens is None else round(row.mean_output_tokens, 1)
+            ),
+        }
+        for row in usage
+    ]
+
+
+st.set_page_config(page_title="Performance", layout="wide")
+try:
+    init_db()
+except RuntimeError as error:
+    st.error(str(error))
+    st.stop()
+
+render_sidebar("Performance")
+
+st.title("Performance")
+st.write(
+    "Timings recorded by this app process since it started (or since the last reset). "
+    "Percentiles are read from log-spaced histograms, so they are accurate to about 20%."
+)
+
+summaries = metrics.snapshot()
+if not summaries:
+    st.info("No timings recorded yet. Generate a joke or open the library, then come back.")
+else:
+    st.dataframe(
+        [
+            {
+                "Operation": summary.name,
+                "Calls": summary.count,
+                "Mean (ms)": to_ms(summary.mean_seconds),
+                "p50 (ms)": to_ms(summary.p50_seconds),
+                "p95 (ms)": to_ms(summary.p95_seconds),
+                "p99 (ms)": to_ms(summary.p99_seconds),
+                "Max (ms)": to_ms(summary.max_seconds),
+                "Total (s)": round(summary.total_seconds, 3),
+            }
+            for summary in summaries
+        ],
+        hide_index=True,
+        use_container_width=True,
+    )
+
+reset_col, prometheus_col, json_col = st.columns(3)
+with reset_col:
+    st.button("Reset timings", on_click=metrics.reset)
+with prometheus_col:
+    st.download_button(
+        "Download Prometheus text",
+        data=metrics.prometheus_text(),
+        file_name="joke-studio-metrics.txt",
+        mime="text/plain",
+    )
+with json_col:
+    st.download_button(
+        "Download JSON",
+        data=metrics.json_text(),
+        file_name="joke-studio-metrics.json",
+        mime="application/json",
+    )
+
+st.subheader("Saved generations")
+st.caption(
+    "From the saved jokes. Latency and token averages cover OpenAI calls only; "
+    "jokes saved before this was recorded are counted but have no usage data."
+)
+try:
+    by_template = generation_usage_by_template()
+    by_day = generation_usage_by_day(days=30)
+except RuntimeError as error:
+    st.warning(str(error))
+else:
+    template_tab, day_tab = st.tabs(["Per template", "Per day (last 30 days)"])
+    with template_tab:
+        st.dataframe(usage_rows(by_template, "Template"), hide_index=True, use_container_width=True)
+    with day_tab:
+        st.dataframe(usage_rows(by_day, "Day"), hide_index=True, use_container_width=True)
+
+st.subheader("LLM calls")
+calls = llm_call_stats()
+st.write(
+    f"{calls.calls} calls, {calls.attempts} attempts, {calls.retries} retries "
+    f"({calls.rate_limited} rate limited, {calls.transient_errors} transient errors), "
+    f"{calls.total_backoff_seconds:.1f}s spent backing off"
+)
+st.write(
+    f"Circuit breaker: {calls.circuit_state}, {calls.circuit_rejections} call(s) failed fast while open"
+)
+if calls.limiter is not None:
+    st.write(
+        f"Client rate limiter: {calls.limiter.throttled} of {calls.limiter.acquired} attempts queued, "
+        f"{calls.limiter.total_wait_seconds:.1f}s total wait, longest {calls.limiter.max_wait_seconds:.2f}s"
+    )
+
+for label, hedging in hedging_stats().items():
+    delay = (
+        "not hedging yet"
+        if hedging.hedge_delay_seconds is None
+        else f"hedging after {hedging.hedge_delay_seconds:.2f}s"
+    )
+    st.write(
+        f"Model {label}: {hedging.requests} request(s), {hedging.hedged} hedged, won by the first "
+        f"request {hedging.primary_wins} time(s) and by the hedge {hedging.hedge_wins} time(s), "
+        f"{hedging.deadline_exceeded} past the deadline ({delay})"
+    )
+coalescing = coalescing_stats()
+st.write(
+    f"Request coalescing: {coalescing.followers} of {coalescing.leaders + coalescing.followers} "
+    f"generation(s) shared an identical in-flight call ({coalescing.coalesced_rate:.0%}), "
+    f"{coalescing.in_flight} in flight now"
+)
+
+st.subheader("Caches and connection pools")
+query_cache = query_cache_stats()
+generation = generation_cache.stats()
+st.write(
+    f"Library query cache: {query_cache.hit_rate:.0%} hit rate "
+    f"({query_cache.hits} hits, {query_cache.misses} misses, {query_cache.size}/{query_cache.maxsize} entries)"
+)
+st.write(
+    f"Generation cache: {generation.memory_hits} memory hits, {generation.database_hits} database hits, "
+    f"{generation.misses} misses"
+)
+for label, pool in (("Primary pool", database_pool_metrics()), ("Replica pool", read_pool_metrics())):
+    if pool is not None:
+        st.write(
+            f"{label}: {pool.checked_out}/{pool.capacity} in use (peak {pool.peak_checked_out}), "
+            f"{pool.checkouts} checkouts, mean wait {pool.mean_wait_ms:.2f} ms, {pool.timeouts} timeouts"
+        )